@@ -4,38 +4,65 @@ from flask_bootstrap import Bootstrap5
 from flask_ckeditor import CKEditor
 from flask_login import LoginManager
 from flask import Flask, render_template, render_template_string, request, redirect
-from db_seed import setup_db
-from routes import init
+from routes import init_routes
 from config import Config
+from cli import assets_cli, db_cli
+from models import engine, write_engine
+from utils.assets import AssetFlask
+from utils.compression import init_compression
+from utils.metrics import init_metrics
+from utils.profiling import init_profiling
+from utils.fragments import render_note_fragment
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-csrf = CSRFProtect(app)
-
-app.config["BOOTSTRAP_SERVE_LOCAL"] = True
-app.config["CKEDITOR_SERVE_LOCAL"] = True
-bootstrap = Bootstrap5(app)
+csrf = CSRFProtect()
+bootstrap = Bootstrap5()
 login_manager = LoginManager()
-login_manager.init_app(app)
 ckeditor = CKEditor()
 
-ckeditor.init_app(app)
-init()
-setup_db()
-
 
-@login_manager.unauthorized_handler
 def unauthorized():
     return redirect("/login")
 
 
-@app.errorhandler(404)
 def page_not_found(error):
     return render_template("404.html"), 404
 
 
-@app.context_processor
 def inject_csrf_token():
-    return dict(csrf_token=generate_csrf)
\ No newline at end of file
+    return dict(csrf_token=generate_csrf)
+
+
+def create_app() -> Flask:
+    # Only builds the app object: no schema work and no seeding here, those
+    # are `flask db init` / `flask db seed` (see cli.py), run once per deploy
+    # instead of in every worker. Settings come from Config, which the
+    # engines, caches and rate limiter also read at import time.
+    flask_app = AssetFlask(__name__)
+    flask_app.config.from_object(Config)
+    flask_app.load_assets()
+    flask_app.config["BOOTSTRAP_SERVE_LOCAL"] = True
+    flask_app.config["CKEDITOR_SERVE_LOCAL"] = True
+
+    csrf.init_app(flask_app)
+    bootstrap.init_app(flask_app)
+    login_manager.init_app(flask_app)
+    login_manager.unauthorized_handler(unauthorized)
+    ckeditor.init_app(flask_app)
+
+    flask_app.add_template_global(render_note_fragment, "note_fragment")
+    flask_app.register_error_handler(404, page_not_found)
+    flask_app.context_processor(inject_csrf_token)
+    flask_app.cli.add_command(db_cli)
+    flask_app.cli.add_command(assets_cli)
+    if flask_app.config["METRICS_ENABLED"]:
+        init_metrics(flask_app, engine, write_engine)
+    if flask_app.config["PROFILING_ENABLED"]:
+        init_profiling(flask_app, engine, write_engine)
+    if flask_app.config["COMPRESSION_ENABLED"]:
+        init_compression(flask_app)
+    init_routes(flask_app)
+    return flask_app
+
+
+app = create_app()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Microbenchmark: bcrypt hashes/sec per cost level, serial and from --threads threads.
+
+bcrypt releases the GIL, so the threaded rate shows how much a worker
+serving requests from several threads can hash at once.
+
+    python benchmarks/bcrypt_cost.py --min-cost 10 --max-cost 13 --hashes 8 --threads 2
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bcrypt import gensalt, hashpw  # pylint: disable=wrong-import-position
+from config import Config  # pylint: disable=wrong-import-position
+from utils import passwords  # pylint: disable=wrong-import-position
+
+PASSWORD = b"correct horse battery staple"
+
+
+def serial_rate(cost: int, hashes: int) -> float:
+    start = time.perf_counter()
+    for _ in range(hashes):
+        hashpw(PASSWORD, gensalt(rounds=cost))
+    return hashes / (time.perf_counter() - start)
+
+
+def threaded_rate(cost: int, hashes: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: passwords.hash_password(PASSWORD.decode(), cost),
+                          range(hashes)))
+    return hashes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-cost", type=int, default=10)
+    parser.add_argument("--max-cost", type=int, default=13)
+    parser.add_argument("--hashes", type=int, default=8,
+                        help="hashes per cost level")
+    parser.add_argument("--threads", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"threads: {args.threads}, configured cost: {Config.BCRYPT_ROUNDS}")
+    print(f"{'cost':>4} {'ms/hash':>9} {'serial h/s':>11} {'threaded h/s':>13}")
+    for cost in range(args.min_cost, args.max_cost + 1):
+        serial = serial_rate(cost, args.hashes)
+        threaded = threaded_rate(cost, args.hashes, args.threads)
+        print(f"{cost:>4} {1000 / serial:>9.1f} {serial:>11.2f} {threaded:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
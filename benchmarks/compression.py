@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Bytes on the wire and CPU cost per page for each response encoding.
+
+Seeds a throwaway database with a synthetic dataset, logs in as a synthetic
+user and requests /home, /accounts/notes, /search and GET /notes once per
+encoding the app can offer (identity, gzip, and br / zstd when brotli /
+zstandard are installed). Reports the response size, the compression ratio,
+the CPU time per request and the part of it spent compressing.
+
+    python benchmarks/compression.py --notes 20000 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGES = ("/home", "/accounts/notes", "/search?search=lorem", "/notes")
+
+
+def cpu_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        func()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--pages", default=",".join(PAGES))
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sevfa-bench-'), 'bench.db')}")
+
+    # pylint: disable=import-outside-toplevel
+    import migrations
+    from app import app
+    from db_seed import SYNTHETIC_EMAIL, SYNTHETIC_PASSWORD, generate_dataset
+    from models import engine
+    from utils.compression import ENCODERS, MIMETYPE_RULES
+
+    migrations.upgrade(engine)
+    generate_dataset(users=args.users, notes=args.notes, codes=0)
+    app.config["WTF_CSRF_ENABLED"] = False
+    client = app.test_client()
+    client.post("/login", data={"email": SYNTHETIC_EMAIL.format(0),
+                                "password": SYNTHETIC_PASSWORD})
+
+    encodings = ["identity"] + [name for name in app.config["COMPRESSION_ENCODINGS"]
+                                if name in ENCODERS]
+    print(f"{'page':<22} {'encoding':<9} {'bytes':>9} {'ratio':>6} {'cpu ms':>8} "
+          f"{'compress ms':>12}")
+    for page in args.pages.split(","):
+        identity = client.get(page, headers={"Accept-Encoding": "identity"})
+        body = identity.get_data()
+        rule = MIMETYPE_RULES.get(identity.mimetype, {})
+        for encoding in encodings:
+            headers = {"Accept-Encoding": encoding}
+            response = client.get(page, headers=headers)
+            size = len(response.get_data())
+            request_ms = cpu_ms(lambda h=headers: client.get(page, headers=h).get_data(),
+                                args.repeat)
+            compress_ms = 0.0
+            if encoding != "identity":
+                with app.app_context():
+                    def compress(name=encoding):
+                        encoder = ENCODERS[name](rule.get("level") == "fast")
+                        return encoder.compress(body) + encoder.finish()
+                    compress_ms = cpu_ms(compress, args.repeat)
+            print(f"{page:<22} {encoding:<9} {size:>9} {len(body) / size:>6.1f} "
+                  f"{request_ms:>8.2f} {compress_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Run profile image import jobs against a local stand-in image server.
+
+Starts an HTTP server on 127.0.0.1 and submits import jobs for it through
+utils.image_jobs, exactly as POST /account/image does, then waits for each
+job to leave `pending` and compares its status and error with the expected
+ones:
+
+    image        200 image/png                      -> done
+    not-image    200 text/html                      -> failed, not an image
+    oversize     200 image/png, MAX_IMAGE_SIZE + 1  -> failed, too large
+    private      302 to http://10.0.0.5/x.png       -> failed, unsafe URL
+    ftp          302 to ftp://10.0.0.5/x.png        -> failed, unsafe URL
+
+Loopback is normally rejected by the SSRF check, so for this run only
+127.0.0.1 counts as a public address; every other private range is still
+refused. Exits non-zero when a job ends differently or stays pending.
+
+    python benchmarks/image_import.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PNG = (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06"
+       b"\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01"
+       b"\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # path -> (status, headers, body)
+    routes = {}
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        status, headers, body = self.routes.get(self.path, (404, {}, b""))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def wait_for(job_id, user_id, timeout):
+    from models.image_import_job import JOB_PENDING  # pylint: disable=import-outside-toplevel
+    from utils.image_jobs import get_image_import  # pylint: disable=import-outside-toplevel
+
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_image_import(job_id, user_id)
+        if job.status != JOB_PENDING or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timeout", type=float, default=10, help="seconds per job")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sevfa-imports-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'imports.db')}"
+    os.environ["DNS_CACHE_ENABLED"] = "false"
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    # pylint: disable=import-outside-toplevel
+    import migrations
+    from db_seed import generate_dataset
+    from models import Session, User, engine
+    from models.image_import_job import JOB_DONE, JOB_FAILED
+    from utils import resolver
+    from utils.image_jobs import submit_image_import
+    from utils.profile_image import MAX_IMAGE_SIZE
+
+    migrations.upgrade(engine)
+    generate_dataset(users=1, notes=0, codes=0, avatar_fraction=0)
+    with Session() as session:
+        user_id = session.query(User.id).order_by(User.id).limit(1).scalar()
+
+    is_public = resolver._is_public  # pylint: disable=protected-access
+    resolver._is_public = lambda ip: str(ip) == "127.0.0.1" or is_public(ip)  # pylint: disable=protected-access
+
+    StandInHandler.routes = {
+        "/image.png": (200, {"Content-Type": "image/png"}, PNG),
+        "/page.html": (200, {"Content-Type": "text/html"}, b"<html></html>"),
+        "/big.png": (200, {"Content-Type": "image/png"}, b"\0" * (MAX_IMAGE_SIZE + 1)),
+        "/private.png": (302, {"Location": "http://10.0.0.5/x.png"}, b""),
+        "/ftp.png": (302, {"Location": "ftp://10.0.0.5/x.png"}, b""),
+    }
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    cases = [
+        ("image", "/image.png", JOB_DONE, None),
+        ("not-image", "/page.html", JOB_FAILED, "URL does not point to an image."),
+        ("oversize", "/big.png", JOB_FAILED, "Image is too large."),
+        ("private", "/private.png", JOB_FAILED, "Unsafe image URL."),
+        ("ftp", "/ftp.png", JOB_FAILED, "Unsafe image URL."),
+    ]
+    failures = 0
+    print(f"{'case':<12} {'expected':>8} {'status':>8} {'ms':>7}  error")
+    for name, path, expected, expected_error in cases:
+        start = time.perf_counter()
+        job = wait_for(submit_image_import(user_id, base + path).id, user_id, args.timeout)
+        elapsed = (time.perf_counter() - start) * 1000
+        ok = job.status == expected and job.error == expected_error
+        failures += not ok
+        print(f"{name:<12} {expected:>8} {job.status:>8} {elapsed:>7.0f}  {job.error or ''}"
+              f"{'' if ok else '  <-- unexpected'}")
+
+    with Session() as session:
+        stored = session.get(User, user_id).profile_image
+    if not stored or not stored.startswith(b"data:image/png;base64,"):
+        print("the successful import did not store the image")
+        failures += 1
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Load test the hot endpoints: throughput and p50/p95/p99 latency as JSON.
+
+Seeds a throwaway database with a synthetic dataset, then drives /login,
+/home, GET /notes, /search, POST /notes and /notes/<id>/edit from N threads,
+either through the Werkzeug test client (in-process) or over HTTP against a
+local threaded server. --url targets a server that is already running (e.g.
+uWSGI behind nginx) whose database was filled by `flask db generate`; start
+it with RATE_LIMIT_ENABLED=false, all workers log in from one address.
+
+    python benchmarks/loadtest.py --mode client --requests 500 --concurrency 4 --json out.json
+    python benchmarks/loadtest.py --mode server --baseline out.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, build_opener
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Words used by db_seed.generate_dataset, so searches find notes
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua").split()
+_CSRF = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+class TestClient:
+    # Werkzeug test client: no sockets, measures the app + database only
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self._client.open(path, method=method, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+
+class HttpClient:
+    # One cookie jar per worker; redirects are returned, not followed
+
+    class _NoRedirect(HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self._base_url = base_url.rstrip("/")
+        self._opener = build_opener(HTTPCookieProcessor(CookieJar()), self._NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urlencode(data).encode() if data is not None else None
+        try:
+            with self._opener.open(self._base_url + path, data=body, timeout=30) as response:
+                return response.status, response.read().decode()
+        except HTTPError as e:
+            return e.code, e.read().decode()
+
+
+def seed(args):
+    # pylint: disable=import-outside-toplevel
+    import migrations
+    from db_seed import generate_dataset
+    from models import engine
+
+    migrations.upgrade(engine)
+    generate_dataset(users=args.users, notes=args.notes, avatar_fraction=0, codes=0,
+                     seed=args.seed)
+
+
+def login(client, worker):
+    from db_seed import SYNTHETIC_EMAIL, SYNTHETIC_PASSWORD  # pylint: disable=import-outside-toplevel
+
+    _, body = client.request("GET", "/login")
+    token = _CSRF.search(body).group(1)
+    credentials = {"csrf_token": token, "email": SYNTHETIC_EMAIL.format(worker),
+                   "password": SYNTHETIC_PASSWORD}
+    client.request("POST", "/login", credentials)
+    return token, credentials
+
+
+# Status a successful request returns; anything else counts as an error
+# (e.g. a 302 to /login on a GET means the worker lost its session).
+EXPECTED_STATUS = {"login": 302, "home": 200, "notes": 200, "search": 200,
+                   "add_note": 302, "edit_note": 302}
+
+
+def scenarios(rng):
+    # name -> callable(client, state) returning the response status
+    def add_note(client, state):
+        return client.request("POST", "/notes", {
+            "csrf_token": state["token"], "title": "load test",
+            "text": f"<p>{rng.choice(WORDS)} {rng.choice(WORDS)}</p>"})[0]
+
+    def edit_note(client, state):
+        return client.request("POST", f"/notes/{state['note_id']}/edit", {
+            "csrf_token": state["token"], "title": f"edited {rng.choice(WORDS)}",
+            "text": f"<p>{rng.choice(WORDS)}</p>"})[0]
+
+    return {
+        "login": lambda client, state: client.request("POST", "/login", state["credentials"])[0],
+        "home": lambda client, state: client.request("GET", "/home")[0],
+        "notes": lambda client, state: client.request("GET", "/notes")[0],
+        "search": lambda client, state: client.request(
+            "GET", f"/search?search={rng.choice(WORDS)}")[0],
+        "add_note": add_note,
+        "edit_note": edit_note,
+    }
+
+
+def prepare_worker(client, worker):
+    token, credentials = login(client, worker)
+    client.request("POST", "/notes", {"csrf_token": token, "title": "edit target",
+                                      "text": "<p>edit me</p>"})
+    _, body = client.request("GET", "/notes")
+    note_id = next(note["id"] for note in json.loads(body)["notes"]
+                   if note["title"] == "edit target")
+    return {"token": token, "credentials": credentials, "note_id": note_id}
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, clients, states, requests, seed_value):
+    per_worker = max(1, requests // len(clients))
+    latencies = [[] for _ in clients]
+    errors = [0] * len(clients)
+
+    def worker(index):
+        action = scenarios(random.Random(seed_value + index))[name]
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            status = action(clients[index], states[index])
+            latencies[index].append(time.perf_counter() - start)
+            if status != EXPECTED_STATUS[name]:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(clients))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    values = sorted(value * 1000 for worker_values in latencies for value in worker_values)
+    return {
+        "requests": len(values),
+        "errors": sum(errors),
+        "throughput_rps": round(len(values) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(values), 2),
+        "p50_ms": round(percentile(values, 0.50), 2),
+        "p95_ms": round(percentile(values, 0.95), 2),
+        "p99_ms": round(percentile(values, 0.99), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline):
+    print(f"{'scenario':<10} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+          + ("   p95 vs baseline" if baseline else ""))
+    for name, result in results.items():
+        line = (f"{name:<10} {result['throughput_rps']:>9} {result['p50_ms']:>9} "
+                f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['errors']:>7}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            change = (result["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   {change:+.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("client", "server"), default="client")
+    parser.add_argument("--url", help="run against an already running, seeded server")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=400, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", default="login,home,notes,search,add_note,edit_note")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="JSON from a previous run to compare against")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        clients = [HttpClient(args.url) for _ in range(args.concurrency)]
+    else:
+        os.environ["DATABASE_URL"] = (
+            f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sevfa-load-'), 'load.db')}")
+        # Every worker logs in from 127.0.0.1: the login limits would turn the
+        # login scenario into a 429 benchmark (see login_flood.py for those)
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        from app import app  # pylint: disable=import-outside-toplevel
+        seed(args)
+
+        if args.mode == "client":
+            clients = [TestClient(app) for _ in range(args.concurrency)]
+        else:
+            from werkzeug.serving import make_server  # pylint: disable=import-outside-toplevel
+            logging.getLogger("werkzeug").setLevel(logging.WARNING)
+            server = make_server("127.0.0.1", 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            clients = [HttpClient(f"http://127.0.0.1:{server.server_port}")
+                       for _ in range(args.concurrency)]
+
+    states = [prepare_worker(client, worker) for worker, client in enumerate(clients)]
+    results = {name: run_scenario(name, clients, states, args.requests, args.seed)
+               for name in args.scenarios.split(",")}
+    if server is not None:
+        server.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "mode": "url" if args.url else args.mode,
+        "config": {key: getattr(args, key)
+                   for key in ("users", "notes", "requests", "concurrency", "seed")},
+        "results": results,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""/home latency before and during a /login flood, with and without rate limiting.
+
+Seeds a throwaway database, adds victim accounts hashed at the configured
+BCRYPT_ROUNDS and forks --workers single-threaded server processes that
+accept on one shared socket, like uWSGI's process pool (the rate limiter
+state is shared between them through RATE_LIMIT_DB). A probe client
+requests /home every --interval seconds, first alone, then while --flooders
+threads POST wrong passwords for the victims as fast as they can.
+
+    python benchmarks/login_flood.py
+    python benchmarks/login_flood.py --no-limit    # the same flood, unthrottled
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest import HttpClient, percentile  # pylint: disable=wrong-import-position
+
+
+def probe(client, duration, interval):
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status, _ = client.request("GET", "/home")
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] += 1
+        time.sleep(interval)
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "statuses": dict(statuses),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def flood(base_url, victims, stop, statuses, lock):
+    client = HttpClient(base_url)
+    attempt = 0
+    while not stop.is_set():
+        status, _ = client.request("POST", "/login", {
+            "email": victims[attempt % len(victims)], "password": f"wrong{attempt}"})
+        attempt += 1
+        with lock:
+            statuses[status] += 1
+
+
+def start_workers(app, workers):
+    # Preforked like uWSGI: the app is imported once, then every child serves
+    # one request at a time from the shared listening socket
+    from werkzeug.serving import make_server  # pylint: disable=import-outside-toplevel
+
+    listener = socket.create_server(("127.0.0.1", 0))
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            server = make_server("127.0.0.1", listener.getsockname()[1], app,
+                                 fd=listener.fileno())
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)  # pylint: disable=protected-access
+        pids.append(pid)
+    return f"http://127.0.0.1:{listener.getsockname()[1]}", pids
+
+
+def stop_workers(pids):
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--no-limit", action="store_true", help="disable rate limiting")
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--flooders", type=int, default=16)
+    parser.add_argument("--victims", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sevfa-flood-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'flood.db')}"
+    os.environ["RATE_LIMIT_DB"] = os.path.join(workdir, "ratelimit.db")
+    os.environ["RATE_LIMIT_ENABLED"] = "false" if args.no_limit else "true"
+
+    # pylint: disable=import-outside-toplevel
+    import logging
+    import migrations
+    from app import app
+    from db_seed import SYNTHETIC_EMAIL, SYNTHETIC_PASSWORD, generate_dataset
+    from models import Session, User, engine
+    from utils.passwords import hash_password
+
+    migrations.upgrade(engine)
+    generate_dataset(users=20, notes=2000, avatar_fraction=0, codes=0)
+    victims = [f"victim{i}@example.com" for i in range(args.victims)]
+    with Session() as session:
+        password = hash_password("not-the-password")
+        session.add_all(User(email, password) for email in victims)
+        session.commit()
+
+    # A real attacker scrapes the token; here it would only add a GET per attempt
+    app.config["WTF_CSRF_ENABLED"] = False
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    base_url, pids = start_workers(app, args.workers)
+
+    client = HttpClient(base_url)
+    client.request("POST", "/login", {"email": SYNTHETIC_EMAIL.format(0),
+                                      "password": SYNTHETIC_PASSWORD})
+    results = {"baseline": probe(client, args.duration, args.interval)}
+
+    stop, lock, flood_statuses = threading.Event(), threading.Lock(), Counter()
+    flooders = [threading.Thread(target=flood, args=(base_url, victims, stop, flood_statuses, lock))
+                for _ in range(args.flooders)]
+    start = time.perf_counter()
+    for thread in flooders:
+        thread.start()
+    results["flood"] = probe(client, args.duration, args.interval)
+    stop.set()
+    for thread in flooders:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop_workers(pids)
+
+    print(f"rate limiting {'off' if args.no_limit else 'on'}, {args.workers} workers, "
+          f"BCRYPT_ROUNDS={app.config['BCRYPT_ROUNDS']}")
+    print(f"{'phase':<9} {'requests':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9}  statuses")
+    for phase, result in results.items():
+        print(f"{phase:<9} {result['requests']:>8} {result['mean_ms']:>9} {result['p50_ms']:>9} "
+              f"{result['p95_ms']:>9} {result['p99_ms']:>9}  {result['statuses']}")
+    total = sum(flood_statuses.values())
+    print(f"flood: {total} login attempts, {total / elapsed:.0f}/s, statuses {dict(flood_statuses)}")
+
+
+if __name__ == "__main__":
+    main()
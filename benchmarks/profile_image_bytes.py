@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Count the bytes loaded into User objects per request for /home and /admin/users.
+
+Creates a throwaway database with N users that all have a profile image and
+one shared note each, then requests the pages as the seeded admin. With
+User.profile_image deferred the avatar bytes column should stay at 0.
+
+    python benchmarks/profile_image_bytes.py --users 1000 --avatar-kb 200
+"""
+import argparse
+import base64
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--avatar-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sevfa-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("SEVFA_ENV", "development")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import event, insert
+    import migrations
+    from app import app
+    from db_seed import setup_db
+    from models import Note, Session, User, engine
+    from utils.profile_image import image_digest
+
+    migrations.upgrade(engine)
+    setup_db()
+
+    avatar = b"data:image/png;base64," + base64.b64encode(os.urandom(args.avatar_kb * 1024))
+    with Session() as session:
+        users = session.execute(insert(User.__table__).returning(User.__table__.c.id), [
+            {"email": f"bench{i}@example.com", "password": "x", "is_admin": False,
+             "profile_image": avatar, "profile_image_digest": image_digest(avatar)}
+            for i in range(args.users)
+        ]).scalars().all()
+        session.execute(insert(Note.__table__), [
+            {"title": f"Note {user_id}", "text": "bench", "private": False, "user_id": user_id}
+            for user_id in users
+        ])
+        session.commit()
+
+    counters = {"users": 0, "bytes": 0, "avatar_bytes": 0}
+
+    @event.listens_for(User, "load")
+    def count_user(target, _context):
+        counters["users"] += 1
+        for key, value in target.__dict__.items():
+            if isinstance(value, (bytes, str)):
+                counters["bytes"] += len(value)
+                if key == "profile_image":
+                    counters["avatar_bytes"] += len(value)
+
+    app.config["WTF_CSRF_ENABLED"] = False
+    client = app.test_client()
+    client.post("/login", data={"email": "admin@evfa.com", "password": "admin"})
+
+    print(f"{args.users} users with {len(avatar) / 1024:.0f} KiB avatars")
+    print(f"{'path':<16} {'status':>6} {'users':>7} {'bytes':>12} {'avatar bytes':>14}")
+    for path in ("/home", "/admin/users"):
+        for key in counters:
+            counters[key] = 0
+        status = client.get(path).status_code
+        print(f"{path:<16} {status:>6} {counters['users']:>7} {counters['bytes']:>12} "
+              f"{counters['avatar_bytes']:>14}")
+    print(f"eager loading would add {len(avatar)} bytes per loaded user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Benchmark note sanitization on large CKEditor-style documents.
+
+Compares the old per-call bleach.clean() with the reusable NoteSanitizer,
+cold (cache miss) and warm (unchanged content, e.g. an edit that resubmits
+the same body).
+
+    python benchmarks/sanitizer.py --docs 20 --paragraphs 400
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bleach  # pylint: disable=wrong-import-position
+from utils.sanitizer import ALLOWED_TAGS, NoteSanitizer  # pylint: disable=wrong-import-position
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua").split()
+
+
+def ckeditor_document(rng: random.Random, paragraphs: int) -> str:
+    # Roughly what CKEditor 4 produces: styled spans, links, lists, tables
+    parts = []
+    for i in range(paragraphs):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        kind = i % 5
+        if kind == 0:
+            parts.append(f'<p><strong>{words[:30]}</strong> {words}</p>')
+        elif kind == 1:
+            parts.append(f'<p><span style="color:#e74c3c">{words}</span>&nbsp;'
+                         f'<a href="https://example.com/{i}">link</a></p>')
+        elif kind == 2:
+            items = "".join(f"<li><em>{rng.choice(WORDS)}</em> {words[:40]}</li>"
+                            for _ in range(5))
+            parts.append(f"<ul>{items}</ul>")
+        elif kind == 3:
+            parts.append(f'<table border="1"><tbody><tr><td>{words[:50]}</td>'
+                         f'<td><img src="https://example.com/{i}.png" /></td></tr>'
+                         f'</tbody></table>')
+        else:
+            parts.append(f"<p>{words}<br />\n<u>{words[:20]}</u></p>")
+    return "\n".join(parts)
+
+
+def timed(label: str, func, docs, total_bytes: int):
+    start = time.perf_counter()
+    for doc in docs:
+        func(doc)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000 / len(docs):>9.2f} ms/doc "
+          f"{total_bytes / elapsed / 1e6:>8.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = [ckeditor_document(rng, args.paragraphs) for _ in range(args.docs)]
+    total_bytes = sum(len(doc.encode()) for doc in docs)
+    print(f"{args.docs} documents, {total_bytes / len(docs) / 1024:.0f} KiB average")
+
+    timed("bleach.clean per call", lambda doc: bleach.clean(doc, tags=ALLOWED_TAGS, strip=True),
+          docs, total_bytes)
+
+    sanitizer = NoteSanitizer(ALLOWED_TAGS, cache_size=len(docs))
+    timed("NoteSanitizer (cold)", sanitizer.clean, docs, total_bytes)
+    timed("NoteSanitizer (warm)", sanitizer.clean, docs, total_bytes)
+
+    batch = NoteSanitizer(ALLOWED_TAGS, cache_size=0)
+    start = time.perf_counter()
+    batch.clean_many(docs + docs)
+    print(f"{'clean_many (2x duplicates)':<28} "
+          f"{(time.perf_counter() - start) * 1000 / (2 * len(docs)):>9.2f} ms/doc")
+    print(sanitizer.cache.stats())
+
+
+if __name__ == "__main__":
+    main()
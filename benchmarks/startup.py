@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Measure worker startup: `import app`, time to first request, per-module import cost.
+
+Every measurement runs in a fresh interpreter, the way a uWSGI worker starts.
+
+    python benchmarks/startup.py --runs 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get("/login").status_code
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": done - imported, "status": status}))
+"""
+
+
+def run_python(args, env):
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True,
+                          capture_output=True, text=True)
+
+
+def import_costs(env):
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <module>"
+    stderr = run_python(["-X", "importtime", "-c", "import app"], env).stderr
+    costs = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        costs.append((module.strip(), int(self_us), int(cumulative_us)))
+    return costs
+
+
+def is_local(module):
+    top = module.split(".")[0]
+    return os.path.exists(os.path.join(ROOT, top)) or os.path.exists(
+        os.path.join(ROOT, f"{top}.py"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL",
+                   f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sevfa-bench-'), 'bench.db')}")
+
+    runs = [json.loads(run_python(["-c", _PROBE], env).stdout.splitlines()[-1])
+            for _ in range(args.runs)]
+    for key in ("import", "first_request"):
+        values = [run[key] * 1000 for run in runs]
+        print(f"{key:<16} median {statistics.median(values):8.1f} ms "
+              f"min {min(values):8.1f} ms max {max(values):8.1f} ms")
+    print(f"first request status: {runs[-1]['status']}")
+
+    costs = import_costs(env)
+    print(f"\nTop {args.top} modules by self import time (us):")
+    for module, self_us, cumulative_us in sorted(costs, key=lambda c: -c[1])[:args.top]:
+        print(f"{self_us:>10} {cumulative_us:>12}  {module}")
+
+    print("\nRepository modules, cumulative import time (us):")
+    for module, self_us, cumulative_us in sorted(
+            (c for c in costs if is_local(c[0])), key=lambda c: -c[2]):
+        print(f"{self_us:>10} {cumulative_us:>12}  {module}")
+
+
+if __name__ == "__main__":
+    main()
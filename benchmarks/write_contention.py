@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Many writer processes on one SQLite file: failures, retries and latency.
+
+Forks --processes writers (each with --threads threads) that insert and edit
+notes as fast as they can against a throwaway database, in one of three modes:
+
+    direct   the old pattern: a plain Session per write, commit, no retry
+    write    utils.writes.run_write (BEGIN IMMEDIATE, jittered retry)
+    group    run_write plus group commit of note inserts (WRITE_GROUP_COMMIT)
+
+A short --lock-timeout-ms makes contention visible quickly; the write path
+should report 0 failed writes where the direct one does not. The run ends by
+checking that no two notes got the same change feed version. Exits non-zero
+when the write or group mode loses a write or a version is duplicated.
+
+    python benchmarks/write_contention.py --mode direct --processes 16 --lock-timeout-ms 50
+    python benchmarks/write_contention.py --mode write --processes 16 --lock-timeout-ms 50
+    python benchmarks/write_contention.py --mode group --processes 4 --threads 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loadtest import percentile  # pylint: disable=wrong-import-position
+
+
+def direct_insert(user_id, rng):
+    # pylint: disable=import-outside-toplevel
+    from models import Note, Session
+    from utils.search import index_note
+
+    with Session() as session:
+        note = Note(id=None, created_at=None, title="contention", text=f"<p>{rng.random()}</p>",
+                    private=False, user_id=user_id)
+        session.add(note)
+        session.flush()
+        index_note(session, note)
+        session.commit()
+        return note.id
+
+
+def direct_edit(note_id, rng):
+    # pylint: disable=import-outside-toplevel
+    from models import Note, Session
+    from utils.search import index_note, unindex_note
+
+    with Session() as session:
+        note = session.get(Note, note_id)
+        unindex_note(session, note.id)
+        note.text = f"<p>{rng.random()}</p>"
+        index_note(session, note)
+        session.commit()
+
+
+def write_insert(user_id, rng):
+    # pylint: disable=import-outside-toplevel
+    from models import Note
+    from utils.writes import insert_note
+
+    return insert_note(Note(id=None, created_at=None, title="contention",
+                            text=f"<p>{rng.random()}</p>", private=False, user_id=user_id))
+
+
+def _edit(session, note_id, text):
+    # pylint: disable=import-outside-toplevel
+    from models import Note
+    from utils.search import index_note, unindex_note
+
+    note = session.get(Note, note_id)
+    unindex_note(session, note.id)
+    note.text = text
+    index_note(session, note)
+
+
+def write_edit(note_id, rng):
+    from utils.writes import run_write  # pylint: disable=import-outside-toplevel
+
+    run_write(_edit, note_id, f"<p>{rng.random()}</p>")
+
+
+def writer(mode, index, operations, threads, results):
+    from utils.metrics import WRITES  # pylint: disable=import-outside-toplevel
+
+    insert, edit = (direct_insert, direct_edit) if mode == "direct" else (write_insert, write_edit)
+    latencies, errors = [], Counter()
+    lock = threading.Lock()
+
+    def run(thread_index):
+        rng = random.Random(index * 1000 + thread_index)
+        own = []
+        for _ in range(operations):
+            start = time.perf_counter()
+            try:
+                if own and rng.random() < 0.5:
+                    edit(rng.choice(own), rng)
+                else:
+                    own.append(insert(1, rng))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                with lock:
+                    errors[str(getattr(e, "orig", e))] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    retried = WRITES.labels("retried")._value.get()  # pylint: disable=protected-access
+    results.put((latencies, dict(errors), retried))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("direct", "write", "group"), default="write")
+    parser.add_argument("--processes", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=1, help="writer threads per process")
+    parser.add_argument("--operations", type=int, default=100, help="per thread")
+    parser.add_argument("--lock-timeout-ms", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sevfa-writes-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'writes.db')}"
+    # Both paths get the same lock wait budget
+    os.environ["SQLITE_BUSY_TIMEOUT_MS"] = str(args.lock_timeout_ms)
+    os.environ["WRITE_LOCK_TIMEOUT_MS"] = str(args.lock_timeout_ms)
+    os.environ["WRITE_GROUP_COMMIT"] = "true" if args.mode == "group" else "false"
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    # pylint: disable=import-outside-toplevel
+    import migrations
+    from db_seed import generate_dataset
+    from models import engine
+
+    migrations.upgrade(engine)
+    generate_dataset(users=1, notes=0, codes=0, avatar_fraction=0)
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=writer,
+                                 args=(args.mode, i, args.operations, args.threads, results))
+                 for i in range(args.processes)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(value for result in collected for value in result[0])
+    errors = Counter()
+    for result in collected:
+        errors.update(result[1])
+    retried = sum(result[2] for result in collected)
+
+    print(f"mode={args.mode} processes={args.processes} threads={args.threads} "
+          f"lock timeout={args.lock_timeout_ms} ms")
+    print(f"committed {len(latencies)}, failed {sum(errors.values())}, retried {retried:.0f}, "
+          f"{len(latencies) / elapsed:.0f} writes/s")
+    if latencies:
+        print(f"latency ms: p50 {percentile(latencies, 0.5):.1f}  p95 {percentile(latencies, 0.95):.1f}"
+              f"  p99 {percentile(latencies, 0.99):.1f}  max {latencies[-1]:.1f}")
+    for message, count in errors.most_common():
+        print(f"  {count} x {message}")
+
+    with engine.connect() as connection:
+        duplicates = connection.exec_driver_sql(
+            "SELECT count(*) - count(DISTINCT version) FROM notes").scalar()
+    print(f"duplicate note versions: {duplicates}")
+
+    # The direct mode is expected to lose writes; the write path must not
+    lost = sum(errors.values()) if args.mode != "direct" else 0
+    sys.exit(1 if lost or duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
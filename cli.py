@@ -0,0 +1,113 @@
+import sys
+import click
+from flask.cli import AppGroup
+import migrations
+from models import engine
+from utils.search import rebuild_search_index
+
+db_cli = AppGroup("db", help="Database schema management.")
+assets_cli = AppGroup("assets", help="Static asset pipeline.")
+
+
+def _upgrade():
+    applied = migrations.upgrade(engine)
+    for migration in applied:
+        print(f"Applied {migration.version:04d} {migration.name}")
+    if not applied:
+        print("Database is up to date.")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Apply all pending schema migrations."""
+    _upgrade()
+
+
+@db_cli.command("seed")
+def seed_command():
+    """Insert the sample users, notes and codes (development only)."""
+    # pylint: disable=import-outside-toplevel
+    from db_seed import setup_db
+
+    setup_db()
+
+
+@db_cli.command("generate")
+@click.option("--users", default=1000, show_default=True)
+@click.option("--notes", default=100_000, show_default=True)
+@click.option("--private", "private_fraction", default=0.3, show_default=True,
+              help="Fraction of notes that are private.")
+@click.option("--avatars", "avatar_fraction", default=0.1, show_default=True,
+              help="Fraction of users with a profile image.")
+@click.option("--avatar-kb", default=20, show_default=True)
+@click.option("--codes", default=100, show_default=True)
+@click.option("--seed", default=1, show_default=True)
+@click.option("--search-index/--no-search-index", default=True, show_default=True,
+              help="Rebuild notes_fts afterwards (the slowest step).")
+def generate_command(**options):
+    """Bulk-insert a synthetic dataset for benchmarks (development only)."""
+    # pylint: disable=import-outside-toplevel
+    import os
+    import time
+    from db_seed import SYNTHETIC_EMAIL, SYNTHETIC_PASSWORD, generate_dataset
+
+    if os.environ.get("SEVFA_ENV", "development") != "development":
+        print("Skipping synthetic data: not running in development environment.")
+        return
+
+    start = time.perf_counter()
+    counts = generate_dataset(**options)
+    print(f"Inserted {counts['users']} users, {counts['notes']} notes and "
+          f"{counts['codes']} codes in {time.perf_counter() - start:.1f}s "
+          f"(log in as {SYNTHETIC_EMAIL.format('<n>')} / {SYNTHETIC_PASSWORD}).")
+
+
+@db_cli.command("init")
+@click.pass_context
+def init_command(ctx):
+    """Create or upgrade the schema, then seed it in development."""
+    _upgrade()
+    ctx.invoke(seed_command)
+
+
+@db_cli.command("status")
+def status_command():
+    """List schema migrations and whether they are applied."""
+    applied = migrations.applied_versions(engine)
+    for migration in migrations.discover():
+        state = "applied" if migration.version in applied else "pending"
+        print(f"{migration.version:04d} {migration.name:<30} {state}")
+
+
+@db_cli.command("check-plans")
+def check_plans_command():
+    """EXPLAIN QUERY PLAN the hot queries; fail if one scans a whole table."""
+    # pylint: disable=import-outside-toplevel
+    from utils.query_plans import check_query_plans
+
+    failed = False
+    for name, (ok, plan) in check_query_plans(engine).items():
+        failed = failed or not ok
+        click.echo(f"{'ok  ' if ok else 'FAIL'} {name}")
+        for step in plan:
+            click.echo(f"       {step}")
+    sys.exit(1 if failed else 0)
+
+
+@db_cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Rebuild the notes full-text index from the notes table."""
+    rebuild_search_index(engine)
+    print("Search index rebuilt.")
+
+
+@assets_cli.command("build")
+def build_assets_command():
+    """Fingerprint and precompress static files into ASSETS_DIR."""
+    # pylint: disable=import-outside-toplevel
+    from flask import current_app
+    from utils.assets import build_assets
+
+    output_dir = current_app.config["ASSETS_DIR"]
+    stats = build_assets(current_app, output_dir)
+    print(f"Wrote {stats['files']} files ({stats['gz']} .gz, {stats['br']} .br) to {output_dir}.")
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -16,3 +17,121 @@ class Config:
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Engine / connection pool tuning (see models/__init__.py).
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "-1"))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # PRAGMAs applied to every new SQLite connection. WAL lets readers run
+    # concurrently with the single writer; busy_timeout makes writers wait for
+    # the lock instead of failing immediately with "database is locked".
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Negative values are KiB, positive values are pages (SQLite semantics).
+    SQLITE_CACHE_SIZE = int(os.environ.get("SQLITE_CACHE_SIZE", "-20000"))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # Write path (see utils/writes.py): BEGIN IMMEDIATE waits up to
+    # WRITE_LOCK_TIMEOUT_MS for the lock, then the transaction is retried with
+    # jittered backoff, WRITE_RETRY_ATTEMPTS times in total. Group commit
+    # batches note inserts queued within the window into one transaction.
+    WRITE_LOCK_TIMEOUT_MS = int(os.environ.get("WRITE_LOCK_TIMEOUT_MS", "2000"))
+    WRITE_RETRY_ATTEMPTS = int(os.environ.get("WRITE_RETRY_ATTEMPTS", "4"))
+    WRITE_RETRY_BACKOFF_MS = float(os.environ.get("WRITE_RETRY_BACKOFF_MS", "20"))
+    WRITE_GROUP_COMMIT = os.environ.get("WRITE_GROUP_COMMIT", "false").lower() == "true"
+    WRITE_GROUP_COMMIT_WINDOW_MS = float(os.environ.get("WRITE_GROUP_COMMIT_WINDOW_MS", "2"))
+    WRITE_GROUP_COMMIT_MAX = int(os.environ.get("WRITE_GROUP_COMMIT_MAX", "64"))
+
+    # Number of notes per page on /home and GET /notes (keyset pagination).
+    NOTES_PAGE_SIZE = int(os.environ.get("NOTES_PAGE_SIZE", "20"))
+    NOTES_MAX_PAGE_SIZE = int(os.environ.get("NOTES_MAX_PAGE_SIZE", "100"))
+    # Rows fetched per round trip when GET /notes streams NDJSON.
+    NOTES_STREAM_BATCH = int(os.environ.get("NOTES_STREAM_BATCH", "500"))
+
+    # Incremental sync: changes per GET /notes/changes page, and the optional
+    # server-sent events stream of the same changes. Every open stream keeps a
+    # worker busy, so it is off by default and streams end after MAX_SECONDS.
+    NOTES_CHANGES_LIMIT = int(os.environ.get("NOTES_CHANGES_LIMIT", "500"))
+    NOTES_SSE_ENABLED = os.environ.get("NOTES_SSE_ENABLED", "false").lower() == "true"
+    NOTES_SSE_POLL_INTERVAL = float(os.environ.get("NOTES_SSE_POLL_INTERVAL", "1"))
+    NOTES_SSE_KEEPALIVE = float(os.environ.get("NOTES_SSE_KEEPALIVE", "15"))
+    NOTES_SSE_MAX_SECONDS = float(os.environ.get("NOTES_SSE_MAX_SECONDS", "300"))
+
+    # Browser cache lifetime (seconds) for /users/<id>/avatar before revalidating the ETag.
+    AVATAR_MAX_AGE = int(os.environ.get("AVATAR_MAX_AGE", "300"))
+
+    # Number of ranked results per page on /search.
+    SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "20"))
+
+    # Per-process cache of the identity fields loaded by the Flask-Login user_loader.
+    IDENTITY_CACHE_ENABLED = os.environ.get("IDENTITY_CACHE_ENABLED", "true").lower() == "true"
+    IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", "1024"))
+    IDENTITY_CACHE_TTL = float(os.environ.get("IDENTITY_CACHE_TTL", "30"))
+
+    # bcrypt work factor for new hashes; existing hashes are upgraded on login.
+    BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+
+    # Background threads per worker process that download profile images.
+    IMAGE_IMPORT_WORKERS = int(os.environ.get("IMAGE_IMPORT_WORKERS", "2"))
+
+    # TTL cache for the SSRF DNS checks done before fetching profile images.
+    DNS_CACHE_ENABLED = os.environ.get("DNS_CACHE_ENABLED", "true").lower() == "true"
+    DNS_CACHE_SIZE = int(os.environ.get("DNS_CACHE_SIZE", "512"))
+    DNS_CACHE_TTL = float(os.environ.get("DNS_CACHE_TTL", "60"))
+
+    # Number of sanitized note titles/bodies remembered by content hash (0 disables).
+    SANITIZER_CACHE_SIZE = int(os.environ.get("SANITIZER_CACHE_SIZE", "256"))
+
+    # Number of rendered note fragments kept per worker (0 disables).
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "2048"))
+
+    # Registration codes: listing page size, bulk generation cap and CSV export batch.
+    REGISTRATION_CODES_PAGE_SIZE = int(os.environ.get("REGISTRATION_CODES_PAGE_SIZE", "50"))
+    REGISTRATION_CODES_MAX_BULK = int(os.environ.get("REGISTRATION_CODES_MAX_BULK", "5000"))
+    REGISTRATION_CODES_EXPORT_BATCH = int(os.environ.get("REGISTRATION_CODES_EXPORT_BATCH", "1000"))
+
+    # Users per page on /admin/users.
+    ADMIN_USERS_PAGE_SIZE = int(os.environ.get("ADMIN_USERS_PAGE_SIZE", "50"))
+
+    # Fingerprinted static assets built by `flask assets build` (see utils/assets.py)
+    # and served by nginx under ASSETS_URL_PATH.
+    ASSETS_DIR = os.environ.get("ASSETS_DIR", str(BASE_DIR / "build" / "assets"))
+    ASSETS_URL_PATH = os.environ.get("ASSETS_URL_PATH", "/assets")
+
+    # Prometheus /metrics (see utils/metrics.py). Without a token only loopback
+    # clients may scrape it.
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+    # On-demand request profiling (see utils/profiling.py). Admins trigger it
+    # with "X-Profile: 1" or ?_profile=1; a sample rate > 0 also profiles a
+    # random fraction of all requests.
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_INTERVAL_MS = float(os.environ.get("PROFILING_INTERVAL_MS", "2"))
+    PROFILING_DIR = os.environ.get("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "sevfa-profiles"))
+    PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "50"))
+
+    # Sliding-window limits on /login and /signup as "<hits>/<seconds>", per
+    # client IP and per email, checked before any bcrypt work (see
+    # utils/rate_limit.py). RATE_LIMIT_DB is shared by all workers on the host.
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_DB = os.environ.get("RATE_LIMIT_DB", os.path.join(tempfile.gettempdir(), "sevfa-ratelimit.db"))
+    RATE_LIMIT_LOGIN_IP = os.environ.get("RATE_LIMIT_LOGIN_IP", "20/60")
+    RATE_LIMIT_LOGIN_ACCOUNT = os.environ.get("RATE_LIMIT_LOGIN_ACCOUNT", "10/300")
+    RATE_LIMIT_SIGNUP_IP = os.environ.get("RATE_LIMIT_SIGNUP_IP", "5/300")
+    RATE_LIMIT_SIGNUP_ACCOUNT = os.environ.get("RATE_LIMIT_SIGNUP_ACCOUNT", "3/300")
+
+    # Compression of dynamic responses (see utils/compression.py). Encodings in
+    # server preference order; br and zstd are only offered when the brotli /
+    # zstandard packages are installed.
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_ENCODINGS = tuple(os.environ.get("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(","))
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
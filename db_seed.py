@@ -1,11 +1,39 @@
 import os
-from uuid import uuid4
-from bcrypt import hashpw, gensalt
-from models import RegistrationCode, User, Note, Session
+import random
+import struct
+import zlib
+from base64 import b64encode
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Optional
+from uuid import UUID, uuid4
+from sqlalchemy import column, func, insert, select, table
+from models import RegistrationCode, User, Note, Session, engine
+from models.note_tombstone import next_version
+from models.note_search import search_index_supported
+from utils.search import index_note, rebuild_search_index
+from utils.passwords import hash_password
+from utils.profile_image import image_digest
 
+# Synthetic users are synthetic<n>@example.com; they all share one password
+SYNTHETIC_EMAIL = "synthetic{}@example.com"
+SYNTHETIC_PASSWORD = "synthetic"
+
+# Untyped view of the notes table: rows go to the driver without per-value
+# type processing, which dominates a million-row executemany. Timestamps are
+# preformatted the way the DateTime type stores them on SQLite (naive UTC).
+_NOTES_BULK = table("notes", column("title"), column("text"), column("private"),
+                    column("user_id"), column("created_at"), column("updated_at"),
+                    column("version"))
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+          "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+          "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo").split()
 
-def setup_db():
 
+def setup_db():
+    # Run by `flask db seed` / `flask db init`, never at import time. Expects
+    # the schema to be up to date.
 
     # Only run this seeding logic in development.
     # In production, set SEVFA_ENV=production so this returns immediately.
@@ -23,9 +51,9 @@ def setup_db():
             session.commit()
 
         if session.query(User).count() == 0:
-            user = User('user@evfa.com', hashpw(b'user', gensalt()).decode())
+            user = User('user@evfa.com', hash_password('user'))
             admin = User('admin@evfa.com',
-                         hashpw(b'admin', gensalt()).decode(), True)
+                         hash_password('admin'), True)
 
             session.add(user)
             session.add(admin)
@@ -48,4 +76,127 @@ def setup_db():
 
                 session.add(user_note)
                 session.add(admin_note)
+                session.flush()
+                index_note(session, user_note)
+                index_note(session, admin_note)
                 session.commit()
+
+
+def _ckeditor_body(rng: random.Random) -> str:
+    # Roughly what CKEditor 4 produces: paragraphs, styled spans, links, lists
+    parts = []
+    for i in range(rng.randint(1, 4)):
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 40)))
+        kind = rng.randrange(4)
+        if kind == 0:
+            parts.append(f"<p><strong>{words[:24]}</strong> {words}</p>")
+        elif kind == 1:
+            parts.append(f'<p>{words} <a href="https://example.com/{i}">link</a></p>')
+        elif kind == 2:
+            items = "".join(f"<li>{rng.choice(_WORDS)} {words[:30]}</li>" for _ in range(3))
+            parts.append(f"<ul>{items}</ul>")
+        else:
+            parts.append(f"<p><em>{words}</em></p>")
+    return "\n".join(parts)
+
+
+def _png_data_uri(rng: random.Random, size_kb: int) -> bytes:
+    # A valid RGB PNG of random pixels (incompressible, so ~size_kb on disk)
+    width = max(1, int((size_kb * 1024 / 3) ** 0.5))
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(width))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data)))
+
+    png = (b"\x89PNG\r\n\x1a\n"
+           + chunk(b"IHDR", struct.pack(">IIBBBBB", width, width, 8, 2, 0, 0, 0))
+           + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+    return b"data:image/png;base64," + b64encode(png)
+
+
+def _avatar_columns(avatar: Optional[bytes]) -> dict:
+    return {"profile_image": avatar,
+            "profile_image_digest": image_digest(avatar) if avatar is not None else None}
+
+
+def generate_dataset(users: int = 1000,
+                     notes: int = 100_000,
+                     private_fraction: float = 0.3,
+                     avatar_fraction: float = 0.1,
+                     avatar_kb: int = 20,
+                     codes: int = 100,
+                     days: int = 365,
+                     seed: int = 1,
+                     batch_size: int = 10_000,
+                     search_index: bool = True) -> dict:
+    # Bulk synthetic data for benchmarks: Core executemany INSERTs in batches,
+    # one transaction. Note authorship is Zipf-like (a few users write most
+    # notes) and created_at grows with id. The same seed on the same starting
+    # database gives the same rows; rerunning appends new, distinct users/codes.
+
+    if notes and not users:
+        raise ValueError("Synthetic notes need at least one synthetic user.")
+
+    # Lowest bcrypt cost, hashed once; logins upgrade it to BCRYPT_ROUNDS
+    password = hash_password(SYNTHETIC_PASSWORD, rounds=4)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=days)
+
+    with engine.begin() as connection:
+        # pylint cannot see through SQLAlchemy's generated func namespace
+        offset = connection.execute(
+            select(func.count()).select_from(User.__table__)).scalar()  # pylint: disable=not-callable
+        first_user_id = (connection.execute(select(func.max(User.id))).scalar() or 0) + 1
+        rng = random.Random(f"{seed}:{offset}")
+        # Bodies and avatars come from pools: generating millions is the slow part
+        bodies = [_ckeditor_body(rng) for _ in range(min(notes, 2000))]
+        avatars = ([_avatar_columns(_png_data_uri(rng, avatar_kb)) for _ in range(8)]
+                   if avatar_fraction else [])
+        no_avatar = _avatar_columns(None)
+
+        for first in range(0, users, batch_size):
+            connection.execute(insert(User.__table__), [{
+                "email": SYNTHETIC_EMAIL.format(offset + i),
+                "password": password,
+                "is_admin": False,
+                "created_at": start,
+                **(rng.choice(avatars) if rng.random() < avatar_fraction else no_avatar),
+            } for i in range(first, min(first + batch_size, users))])
+
+        user_ids = connection.execute(
+            select(User.id).where(User.id >= first_user_id).order_by(User.id)).scalars().all()
+        cum_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(user_ids))))
+        step = (now - start) / max(notes, 1)
+        naive_start = start.replace(tzinfo=None)
+        first_version = next_version(connection)
+
+        for first in range(0, notes, batch_size):
+            count = min(batch_size, notes - first)
+            authors = rng.choices(user_ids, cum_weights=cum_weights, k=count)
+            texts = rng.choices(bodies, k=count)
+            words = rng.choices(_WORDS, k=2 * count)
+            rows = []
+            for i in range(count):
+                created_at = (naive_start + step * (first + i)).isoformat(" ", "microseconds")
+                rows.append({
+                    "title": f"{words[2 * i].capitalize()} {words[2 * i + 1]} #{first + i}",
+                    "text": texts[i],
+                    "private": rng.random() < private_fraction,
+                    "user_id": authors[i],
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "version": first_version + first + i,
+                })
+            connection.execute(insert(_NOTES_BULK), rows)
+
+        if codes:
+            connection.execute(insert(RegistrationCode.__table__), [
+                {"code": str(UUID(int=rng.getrandbits(128), version=4)), "created_at": now}
+                for _ in range(codes)
+            ])
+
+    if notes and search_index and search_index_supported(engine):
+        rebuild_search_index(engine)
+
+    return {"users": users, "notes": notes, "codes": codes}
@@ -0,0 +1,16 @@
+from wtforms import Form, IntegerField, validators
+from config import Config
+
+
+class BulkRegistrationCodesForm(Form):
+    count = IntegerField(
+        "Number of codes",
+        [
+            validators.InputRequired(message="Number of codes is required."),
+            validators.NumberRange(
+                min=1,
+                max=Config.REGISTRATION_CODES_MAX_BULK,
+                message=f"Between 1 and {Config.REGISTRATION_CODES_MAX_BULK} codes per request.",
+            ),
+        ],
+    )
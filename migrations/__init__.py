@@ -0,0 +1,67 @@
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Set
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection, Engine
+
+# Minimal forward-only migrations. Each module in this package named
+# m<NNNN>_<description>.py defines upgrade(connection); applied versions are
+# recorded in schema_migrations. Run them with `flask db upgrade`.
+#
+# m0001 creates the tables from the current models (checkfirst), so later
+# migrations must be idempotent: on a fresh database their change may
+# already be part of the initial schema.
+
+_MODULE_NAME = re.compile(r"^m(\d{4})_(\w+)$")
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def discover() -> List[Migration]:
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(module.name)
+        if match:
+            step = importlib.import_module(f"{__name__}.{module.name}")
+            migrations.append(Migration(int(match.group(1)), match.group(2), step.upgrade))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def applied_versions(engine: Engine) -> Set[int]:
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        return set(connection.scalars(select(schema_migrations.c.version)))
+
+
+def pending(engine: Engine) -> List[Migration]:
+    applied = applied_versions(engine)
+    return [migration for migration in discover() if migration.version not in applied]
+
+
+def upgrade(engine: Engine) -> List[Migration]:
+    applied = []
+    for migration in pending(engine):
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(schema_migrations.insert().values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.now(timezone.utc)))
+        applied.append(migration)
+    return applied
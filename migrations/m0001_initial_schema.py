@@ -0,0 +1,7 @@
+from sqlalchemy.engine import Connection
+from models import BaseModel
+
+
+def upgrade(connection: Connection) -> None:
+    # What models/__init__.py used to do on import
+    BaseModel.metadata.create_all(bind=connection)
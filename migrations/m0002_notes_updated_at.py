@@ -0,0 +1,8 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("notes")}
+    if "updated_at" not in columns:
+        connection.execute(text("ALTER TABLE notes ADD COLUMN updated_at DATETIME"))
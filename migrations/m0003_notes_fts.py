@@ -0,0 +1,6 @@
+from sqlalchemy.engine import Connection
+from models.note_search import ensure_search_index
+
+
+def upgrade(connection: Connection) -> None:
+    ensure_search_index(connection)
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Indexes for the hot note queries (see utils/query_plans.py):
+# - home feed, shared half:   private = 0 ORDER BY created_at DESC
+# - home feed, private half,
+#   personal notes, search:   user_id = ? ORDER BY created_at DESC
+# SQLite appends the rowid (notes.id) to every index entry, which covers the
+# (created_at, id) keyset tie-break. users.email needs no extra index: its
+# UNIQUE constraint is already backed by sqlite_autoindex_users_1.
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_notes_private_created_at ON notes (private, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_notes_user_id_created_at ON notes (user_id, created_at)",
+)
+
+
+def upgrade(connection: Connection) -> None:
+    for statement in INDEXES:
+        connection.execute(text(statement))
@@ -0,0 +1,13 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from models import NoteTombstone
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("notes")}
+    if "version" not in columns:
+        connection.execute(text("ALTER TABLE notes ADD COLUMN version INTEGER"))
+    # Existing notes enter the change feed in id order, below any new version
+    connection.execute(text("UPDATE notes SET version = id WHERE version IS NULL"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_notes_version ON notes (version)"))
+    NoteTombstone.__table__.create(connection, checkfirst=True)
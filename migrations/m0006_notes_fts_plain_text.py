@@ -0,0 +1,13 @@
+from sqlalchemy.engine import Connection
+from models.note_search import DROP_NOTES_FTS, ensure_search_index, search_index_supported
+from utils.search import fill_search_index
+
+
+def upgrade(connection: Connection) -> None:
+    # notes_fts used to be an external-content table over the stored HTML;
+    # replace it with one holding tag-stripped copies of the notes
+    if not search_index_supported(connection):
+        return
+    connection.execute(DROP_NOTES_FTS)
+    ensure_search_index(connection)
+    fill_search_index(connection)
@@ -0,0 +1,21 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from utils.profile_image import image_digest
+
+_BATCH = 100
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("users")}
+    if "profile_image_digest" not in columns:
+        connection.execute(text("ALTER TABLE users ADD COLUMN profile_image_digest VARCHAR"))
+    # Hash the existing avatars a batch at a time: each one can be a few MB
+    while True:
+        rows = connection.execute(text(
+            "SELECT id, profile_image FROM users WHERE profile_image IS NOT NULL "
+            "AND profile_image_digest IS NULL LIMIT :batch"), {"batch": _BATCH}).all()
+        if not rows:
+            return
+        connection.execute(
+            text("UPDATE users SET profile_image_digest = :digest WHERE id = :id"),
+            [{"id": user_id, "digest": image_digest(blob)} for user_id, blob in rows])
@@ -1,12 +1,14 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 from config import Config
 from .base_model import BaseModel
 from .user import User
 from .registration_code import RegistrationCode
 from .note import Note
+from .note_tombstone import NoteTombstone
+from .image_import_job import ImageImportJob
 
 DB_URL = os.environ.get("DATABASE_URL", Config.SQLALCHEMY_DATABASE_URI)
 
@@ -15,11 +17,81 @@ DB_URL = os.environ.get("DATABASE_URL", Config.SQLALCHEMY_DATABASE_URI)
 
 DEBUG_SQL = os.environ.get("SQL_ECHO", "false").lower() == "true"
 
-engine: Engine = create_engine(
-    DB_URL,
-    echo=DEBUG_SQL,
-)
 
-BaseModel.metadata.create_all(bind=engine)
+def _engine_options(url: str) -> dict:
+    options = {"echo": DEBUG_SQL, "pool_pre_ping": Config.DB_POOL_PRE_PING}
 
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection, pool sizing does not apply
+        return options
+
+    options.update(
+        pool_size=Config.DB_POOL_SIZE,
+        max_overflow=Config.DB_MAX_OVERFLOW,
+        pool_timeout=Config.DB_POOL_TIMEOUT,
+        pool_recycle=Config.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+engine: Engine = create_engine(DB_URL, **_engine_options(DB_URL))
+# Second engine for the write path (utils/writes.py): its transactions start
+# with BEGIN IMMEDIATE, taking SQLite's write lock before the first read.
+write_engine: Engine = create_engine(DB_URL, **_engine_options(DB_URL))
+
+
+def _set_sqlite_pragmas(dbapi_connection, busy_timeout_ms: int):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {busy_timeout_ms:d}")
+        cursor.execute(f"PRAGMA journal_mode = {Config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {Config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size = {Config.SQLITE_CACHE_SIZE:d}")
+        cursor.execute(f"PRAGMA mmap_size = {Config.SQLITE_MMAP_SIZE:d}")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, _connection_record):
+    if engine.dialect.name == "sqlite":
+        _set_sqlite_pragmas(dbapi_connection, Config.SQLITE_BUSY_TIMEOUT_MS)
+
+
+@event.listens_for(write_engine, "connect")
+def _on_write_connect(dbapi_connection, _connection_record):
+    if write_engine.dialect.name == "sqlite":
+        _set_sqlite_pragmas(dbapi_connection, Config.WRITE_LOCK_TIMEOUT_MS)
+        # Stop pysqlite from issuing its own deferred BEGIN, see _begin_immediate
+        dbapi_connection.isolation_level = None
+
+
+@event.listens_for(write_engine, "begin")
+def _begin_immediate(connection):
+    if write_engine.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _dispose_inherited_connections():
+    # uWSGI imports the app in the master and then forks the workers. Pooled
+    # connections must never be shared across processes, so each child drops
+    # the inherited ones (without closing them under the parent's feet) and
+    # opens its own on first use.
+    engine.dispose(close=False)
+    write_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_dispose_inherited_connections)
+
+try:
+    from uwsgidecorators import postfork  # pylint: disable=import-error
+
+    postfork(_dispose_inherited_connections)
+except ImportError:
+    pass
+
+# The schema is managed by migrations/ (flask db upgrade), not at import time.
 Session = sessionmaker(bind=engine)
+# Only through utils.writes.run_write, which retries on lock contention.
+WriteSession = sessionmaker(bind=write_engine, expire_on_commit=False)
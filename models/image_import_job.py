@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from .base_model import BaseModel
+
+JOB_PENDING = "pending"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class ImageImportJob(BaseModel):
+    __tablename__ = "image_import_jobs"
+
+    def __init__(self, user_id: int, url: str):
+        super().__init__()
+        self.user_id = user_id
+        self.url = url
+        self.status = JOB_PENDING
+
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    url = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JOB_PENDING)
+    error = Column(String)
+    finished_at = Column(DateTime(timezone=True))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
@@ -1,11 +1,19 @@
 from dataclasses import dataclass
-from sqlalchemy import Column, Text, String, Integer, ForeignKey, Boolean
+from datetime import datetime, timezone
+from sqlalchemy import Column, Text, String, Integer, ForeignKey, Boolean, DateTime, Index
 from .base_model import BaseModel
 
 
 @dataclass
 class Note(BaseModel):
     __tablename__ = "notes"
+    # Also created for existing databases by migrations/m0004_feed_indexes.py
+    # and m0005_note_versions.py
+    __table_args__ = (
+        Index("ix_notes_private_created_at", "private", "created_at"),
+        Index("ix_notes_user_id_created_at", "user_id", "created_at"),
+        Index("ix_notes_version", "version"),
+    )
     id: int
     created_at: str
     title: str
@@ -17,3 +25,10 @@ class Note(BaseModel):
     text = Column(Text, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"))
     private = Column(Boolean, default=False)
+    # Bumped by the ORM on every UPDATE; drives the GET /notes validators
+    updated_at = Column(DateTime(timezone=True),
+                        default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+    # Position in the change feed (GET /notes/changes), set on every insert
+    # and update by models/note_tombstone.py
+    version = Column(Integer)
@@ -0,0 +1,24 @@
+from typing import Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+# FTS5 index over the notes' title and text as plain text. Notes are stored
+# as sanitized HTML; indexing that would make tag names ("strong", "li")
+# match every formatted note and put markup in the snippets, so this table
+# keeps its own tag-stripped copy, written by utils.search (index_note /
+# unindex_note / fill_search_index). rowid is the note id.
+NOTES_FTS_TABLE = "notes_fts"
+
+CREATE_NOTES_FTS = text(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {NOTES_FTS_TABLE} USING fts5(title, text)")
+
+DROP_NOTES_FTS = text(f"DROP TABLE IF EXISTS {NOTES_FTS_TABLE}")
+
+
+def search_index_supported(bind: Union[Engine, Connection]) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(connection: Connection) -> None:
+    if search_index_supported(connection):
+        connection.execute(CREATE_NOTES_FTS)
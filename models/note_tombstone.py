@@ -0,0 +1,60 @@
+from typing import Union
+from sqlalchemy import Boolean, Column, Integer, event, func, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from .base_model import BaseModel
+from .note import Note
+
+
+class NoteTombstone(BaseModel):
+    # Left behind by a deleted note so GET /notes/changes can report the
+    # deletion; user_id/private decide who may see it, like for the note.
+    __tablename__ = "note_tombstones"
+
+    def __init__(self, note_id: int, user_id: int, private: bool, version: int):
+        super().__init__()
+        self.note_id = note_id
+        self.user_id = user_id
+        self.private = private
+        self.version = version
+
+    note_id = Column(Integer, nullable=False)
+    user_id = Column(Integer)
+    private = Column(Boolean, default=False)
+    version = Column(Integer, nullable=False, index=True)
+
+
+def next_version(bind: Union[Session, Connection]) -> int:
+    # One sequence over notes and tombstones; both columns are indexed, so
+    # this is two index lookups. Writes are serialized (BEGIN IMMEDIATE, see
+    # utils/writes.py), which keeps the numbers unique.
+    notes = bind.scalar(select(func.max(Note.version)))
+    tombstones = bind.scalar(select(func.max(NoteTombstone.version)))
+    return max(notes or 0, tombstones or 0) + 1
+
+
+@event.listens_for(Session, "before_flush")
+def _version_note_changes(session, _flush_context, _instances):
+    # Every ORM insert or update of a note takes the next version and every
+    # delete leaves a tombstone, whichever code path made the change.
+    changed = [obj for obj in session.new if isinstance(obj, Note)]
+    changed += [obj for obj in session.dirty
+                if isinstance(obj, Note) and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Note)]
+    if not changed and not deleted:
+        return
+
+    with session.no_autoflush:
+        version = next_version(session)
+    for note in changed:
+        previous = inspect(note).attrs.private.history.deleted
+        if previous and not previous[0] and note.private:
+            # Shared -> private: gone for everybody but the author, who gets
+            # the note again from the newer upsert below
+            session.add(NoteTombstone(note.id, note.user_id, False, version))
+            version += 1
+        note.version = version
+        version += 1
+    for note in deleted:
+        session.add(NoteTombstone(note.id, note.user_id, note.private, version))
+        version += 1
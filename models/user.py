@@ -1,6 +1,6 @@
 from flask_login import UserMixin
 from sqlalchemy import Column, String, BLOB, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from .base_model import BaseModel
 
 
@@ -16,5 +16,9 @@ class User(BaseModel, UserMixin):
     email = Column(String, unique=True, nullable=False)
     password = Column(String)
     notes = relationship("Note", backref="user")
-    profile_image = Column(BLOB)
+    # Up to a few MB of base64 per user: never loaded with the row. Code that
+    # needs it selects User.profile_image or uses undefer(User.profile_image).
+    profile_image = deferred(Column(BLOB))
+    # sha256 of profile_image, written with it: the avatar ETag without the blob
+    profile_image_digest = Column(String)
     is_admin = Column(Boolean, default=False)
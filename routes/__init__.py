@@ -1,10 +1,9 @@
-# pylint: disable=unused-import,import-outside-toplevel
+from flask import Flask
+from routes import (account, assets, home, login, metrics, notes, registration_codes,
+                    signup, users)
 
 
-def init():
-    import routes.signup
-    import routes.login
-    import routes.notes
-    import routes.account
-    import routes.home
-    import routes.registration_codes
+def init_routes(app: Flask) -> None:
+    for module in (signup, login, notes, account, home, registration_codes, users,
+                   metrics, assets):
+        app.register_blueprint(module.bp)
@@ -1,47 +1,49 @@
 import json
 from uuid import uuid4
 
-from bcrypt import gensalt, hashpw, checkpw
 from flask_login import login_required, current_user
-from flask import redirect, flash, render_template, request, Response, g
+from flask import (Blueprint, current_app, redirect, flash, render_template, request,
+                   Response, g)
 
-from app import app
 from models import Session, Note, User
 from forms.image_form import ImageForm
 from forms.account_form import AccountForm
-from utils.profile_image import get_base64_image_blob
+from utils.admin_users import get_admin_users_page
+from utils.image_jobs import get_image_import, submit_image_import
+from utils.search import search_notes
+from utils.identity import identity_cache, invalidate_identity
+from utils.resolver import dns_cache
+from utils.sanitizer import note_sanitizer
+from utils.fragments import fragment_cache
+from utils.passwords import hash_password, verify_password
+from utils.profiling import list_profile_ids, load_profile
 
+bp = Blueprint("account", __name__)
 
 
-@app.route('/account')
+@bp.route('/account')
 @login_required
 def account():
     return render_template('account.html', uuid=str(uuid4()))
 
 
-@app.route('/search')
+@bp.route('/search')
 @login_required
 def search():
     search_param = request.args.get('search', '')
-    with Session() as session:
-        session.query(Note)
-
-        personal_notes = (
-            session.query(Note)
-            .filter(
-                Note.user_id == current_user.id,
-                Note.text.like(f"%{search_param}%")
-            )
-            .all()
-        )
-        return render_template(
-            'search.html',
-            search=search_param,
-            personal_notes=personal_notes,
-        )
+    page = search_notes(current_user.id,
+                        search_param,
+                        page=request.args.get('page', 1, type=int))
+    return render_template(
+        'search.html',
+        search=search_param,
+        results=page.results,
+        page=page.page,
+        has_next=page.has_next,
+    )
 
 
-@app.route('/accounts/notes')
+@bp.route('/accounts/notes')
 @login_required
 def get_personal_notes():
 
@@ -52,36 +54,39 @@ def get_personal_notes():
                                personal_notes=personal_notes)
 
 
-@app.route('/account/image', methods=['POST'])
+@bp.route('/account/image', methods=['POST'])
 @login_required
 def add_image():
     form = ImageForm(request.form)
+    wants_json = request.accept_mimetypes.best == 'application/json'
 
     if not form.validate():
+        if wants_json:
+            return {'errors': form.errors}, 400
         flash(json.dumps(form.errors), 'error')
         return redirect('/account')
 
-    try:
-        image_blob = get_base64_image_blob(form.url.data)
-    except ValueError as e:
-        # Our own safety checks (unsafe URL, not an image, too large, etc.)
-        flash(str(e), 'error')
-        return redirect('/account')
-    except Exception:
-        # Any unexpected error while fetching/parsing the image
-        flash("Could not download profile image from that URL.", "error")
-        return redirect('/account')
+    # The download happens in the background, see utils/image_jobs.py
+    job = submit_image_import(current_user.id, form.url.data)
 
-    with Session() as session:
-        current_user.profile_image = image_blob.encode()
-        session.merge(current_user)
-        session.commit()
-        flash("Profile image updated.", "success")
+    if wants_json:
+        return job.to_dict(), 202
 
+    flash(f"Profile image import started (job {job.id}). "
+          "Reload this page in a moment to see the new image.", "info")
     return redirect('/account')
 
 
-@app.route("/account", methods=["POST"])
+@bp.route('/account/image/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def image_import_status(job_id: int):
+    job = get_image_import(job_id, current_user.id)
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    return job.to_dict()
+
+
+@bp.route("/account", methods=["POST"])
 @login_required
 def update_account():
     form = AccountForm(request.form)
@@ -98,10 +103,13 @@ def update_account():
     old_password = form.old_password.data
     new_password = form.password.data
 
-    email_changed = new_email != current_user.email
-    password_change_requested = bool(new_password)
-
     with Session() as session:
+        # current_user comes from the identity cache and can be stale: check
+        # and change the row itself, and only the fields being updated
+        user = session.get(User, current_user.id)
+        email_changed = new_email != user.email
+        password_change_requested = bool(new_password)
+
         # If the user changes email or password,
         # they must enter their current password correctly.
         if email_changed or password_change_requested:
@@ -112,10 +120,7 @@ def update_account():
                 )
                 return redirect("/account")
 
-            if not checkpw(
-                old_password.encode("utf-8"),
-                current_user.password.encode("utf-8"),
-            ):
+            if not verify_password(old_password, user.password):
                 flash("Current password is incorrect.", "error")
                 return redirect("/account")
 
@@ -126,42 +131,35 @@ def update_account():
                 .filter(User.email == new_email)
                 .first()
             )
-            if existing and existing.id != current_user.id:
+            if existing and existing.id != user.id:
                 flash(
                     "This email address is already in use by another account.",
                     "error",
                 )
                 return redirect("/account")
 
-            current_user.email = new_email
+            user.email = new_email
 
         # Password is changed only if a new password is provided and confirmed.
         if password_change_requested:
             # form.validate() already ensured length + EqualTo (match)
             # Optional extra: new password must differ from old password
-            if checkpw(
-                new_password.encode("utf-8"),
-                current_user.password.encode("utf-8"),
-            ):
+            if verify_password(new_password, user.password):
                 flash(
                     "New password must be different from the old password.",
                     "error",
                 )
                 return redirect("/account")
 
-            current_user.password = hashpw(
-                new_password.encode("utf-8"),
-                gensalt(),
-            ).decode("utf-8")
-
+            user.password = hash_password(new_password)
 
-        session.merge(current_user)
         session.commit()
+        invalidate_identity(user.id)
         flash("Account updated", "success")
 
     return redirect("/account")
 
-@app.route("/admin/users")
+@bp.route("/admin/users")
 @login_required
 def admin_list_users():
 
@@ -169,13 +167,16 @@ def admin_list_users():
         flash("You are not authorised to view that page.", "error")
         return redirect("/home")
 
-    with Session() as session:
-        users = session.query(User).all()
+    prefix = request.args.get("q", "").strip()
+    page = get_admin_users_page(prefix=prefix or None, after=request.args.get("after"))
 
-    return render_template("admin_users.html", users=users)
+    return render_template("admin_users.html",
+                           users=page.users,
+                           next_cursor=page.next_cursor,
+                           prefix=prefix)
 
 
-@app.route("/admin/users/<int:user_id>/role", methods=["POST"])
+@bp.route("/admin/users/<int:user_id>/role", methods=["POST"])
 @login_required
 def admin_update_user_role(user_id: int):
 
@@ -198,14 +199,78 @@ def admin_update_user_role(user_id: int):
 
         user.is_admin = make_admin
         session.commit()
+        invalidate_identity(user_id)
         flash("User role updated.", "success")
 
     return redirect("/admin/users")
 
+@bp.route("/admin/caches")
+@login_required
+def admin_cache_stats():
+
+    if not current_user.is_admin:
+        return {"error": "Not authorized"}, 403
+
+    # Per-process counters: each uWSGI worker reports its own caches
+    return {
+        "identity": identity_cache.stats(),
+        "dns": dns_cache.stats(),
+        "sanitizer": note_sanitizer.cache.stats(),
+        "fragments": fragment_cache.stats(),
+    }
+
+
+@bp.route("/admin/profiles")
+@login_required
+def admin_profiles():
+
+    if not current_user.is_admin:
+        flash("You are not authorised to view that page.", "error")
+        return redirect("/home")
+
+    profiles = [load_profile(profile_id) for profile_id in list_profile_ids()]
+    return render_template("admin_profiles.html",
+                           profiles=[p for p in profiles if p is not None],
+                           enabled=current_app.config["PROFILING_ENABLED"])
+
+
+@bp.route("/admin/profiles/<profile_id>")
+@login_required
+def admin_profile(profile_id: str):
+
+    if not current_user.is_admin:
+        flash("You are not authorised to view that page.", "error")
+        return redirect("/home")
+
+    profile = load_profile(profile_id)
+    if profile is None:
+        flash("Profile not found (it may have been rotated out).", "warning")
+        return redirect("/admin/profiles")
+
+    return render_template("admin_profile.html", profile=profile)
+
+
+@bp.route("/admin/profiles/<profile_id>/collapsed.txt")
+@login_required
+def admin_profile_collapsed(profile_id: str):
+
+    if not current_user.is_admin:
+        return {"error": "Not authorized"}, 403
+
+    profile = load_profile(profile_id)
+    if profile is None:
+        return {"error": "Profile not found"}, 404
+
+    # Input for flamegraph.pl or speedscope.app
+    return Response(profile["collapsed"] + "\n", mimetype="text/plain",
+                    headers={"Content-Disposition":
+                             f'attachment; filename="{profile_id}.collapsed.txt"'})
+
+
 default_preferences = {"mode": "light"}
 
 
-@app.route("/darkmode", methods=["POST"])
+@bp.route("/darkmode", methods=["POST"])
 @login_required
 def toggle_darkmode():
 
@@ -218,7 +283,7 @@ def toggle_darkmode():
     return redirect("/account")
 
 
-@app.before_request
+@bp.before_app_request
 def before_request():
 
     raw = request.cookies.get("preferences")
@@ -239,7 +304,7 @@ def before_request():
     g.preferences = preferences
 
 
-@app.after_request
+@bp.after_app_request
 def after_request(response: Response) -> Response:
 
     prefs = getattr(g, "preferences", None)
@@ -0,0 +1,23 @@
+from flask import Blueprint, current_app, send_from_directory
+
+bp = Blueprint("assets", __name__)
+
+# Hashed names never change content, so they can be cached for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def assets(filename: str):
+    # Fallback for `flask run` and setups without nginx; in production nginx
+    # serves this prefix straight from ASSETS_DIR (conf/nginx.conf).
+    response = send_from_directory(current_app.config['ASSETS_DIR'], filename,
+                                   max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.record
+def _add_assets_rule(state) -> None:
+    # The prefix is per-app configuration (ASSETS_URL_PATH)
+    state.add_url_rule(f"{state.app.config['ASSETS_URL_PATH']}/<path:filename>",
+                       view_func=assets)
@@ -1,18 +1,27 @@
-from flask import render_template, redirect
+from flask import Blueprint, render_template, redirect, request, flash
 from flask_login import login_required, current_user
 
-from app import app
 from utils.notes import get_notes_for_user
 
+bp = Blueprint("home", __name__)
 
-@app.route("/")
+
+@bp.route("/")
 @login_required
 def index():
     return redirect('/home')
 
 
-@app.route('/home')
+@bp.route('/home')
 @login_required
 def home():
+    try:
+        page = get_notes_for_user(current_user.id,
+                                  cursor=request.args.get('cursor'))
+    except ValueError as e:
+        flash(str(e), 'warning')
+        return redirect('/home')
+
     return render_template('home.html',
-                           notes=get_notes_for_user(current_user.id))
+                           notes=page.notes,
+                           next_cursor=page.next_cursor)
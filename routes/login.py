@@ -1,37 +1,59 @@
 from typing import Union
 from json import dumps
-from flask import render_template, request, redirect, flash
+from flask import Blueprint, render_template, request, redirect, flash
 from flask_login import login_user, logout_user, current_user, login_required
-from bcrypt import checkpw
-from app import app, login_manager
 from models import Session, User
 from forms.login_form import LoginForm
+from utils.identity import load_identity, invalidate_identity
+from utils.passwords import hash_password, needs_rehash, verify_password
+from utils.rate_limit import clear, throttle, too_many_attempts
+
+bp = Blueprint("login", __name__)
 
 
-@login_manager.user_loader
 def load_user(user_id: str) -> Union[User, None]:
-    with Session() as session:
-        return session.get(User, user_id)
+    return load_identity(user_id)
+
+
+@bp.record_once
+def _register_user_loader(state) -> None:
+    # Flask-Login keeps its manager on the app (LoginManager.init_app)
+    state.app.login_manager.user_loader(load_user)
 
 
-@app.route('/login', methods=['GET'])
+@bp.route('/login', methods=['GET'])
 def login():
     return render_template('login.html')
 
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def do_login():
     form = LoginForm(request.form)
 
+    # Throttled before the user lookup and bcrypt: first per client...
+    retry_after = throttle("login_ip", request.remote_addr or "")
+    if retry_after:
+        return too_many_attempts("login.html", retry_after)
+
     if not form.validate():
         flash(dumps(form.errors), 'error')
     else:
+        # ...then per account, against attempts spread over many addresses
+        retry_after = throttle("login_account", form.email.data)
+        if retry_after:
+            return too_many_attempts("login.html", retry_after)
+
         with Session() as session:
             user = session.query(User).filter(
                 User.email == form.email.data).first()
-            if user is not None and checkpw(
-                    form.password.data.encode('utf-8'),
-                    user.password.encode('utf-8')) and login_user(user):
+            if user is not None and verify_password(
+                    form.password.data, user.password) and login_user(user):
+                if needs_rehash(user.password):
+                    # Transparently move the stored hash to the configured cost
+                    user.password = hash_password(form.password.data)
+                    session.commit()
+                    invalidate_identity(user.id)
+                clear("login_account", form.email.data)
                 return redirect("/")
 
     flash('Invalid Credentials!', 'warning')
@@ -40,14 +62,14 @@ def do_login():
     return redirect("/")
 
 
-@app.route('/logout', methods=['GET'])
+@bp.route('/logout', methods=['GET'])
 @login_required
 def logout():
     logout_user()
     return redirect("/")
 
 
-@app.route('/is_logged_in', methods=['GET'])
+@bp.route('/is_logged_in', methods=['GET'])
 def logged_in():
     return {
         'is_logged_in': current_user.is_authenticated,
@@ -0,0 +1,28 @@
+from hmac import compare_digest
+from flask import Blueprint, current_app, abort, request
+
+from utils.metrics import render_metrics
+
+bp = Blueprint("metrics", __name__)
+
+_LOOPBACK = ("127.0.0.1", "::1")
+
+
+@bp.route('/metrics')
+def metrics():
+    # Not behind the login: Prometheus scrapes it. Without METRICS_TOKEN only
+    # local scrapes are answered; behind nginx REMOTE_ADDR is the real client.
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if not compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            abort(403)
+    elif request.remote_addr not in _LOOPBACK:
+        abort(403)
+
+    body, content_type = render_metrics()
+    response = current_app.response_class(body, mimetype=None, content_type=content_type)
+    response.cache_control.no_store = True
+    return response
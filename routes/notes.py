@@ -1,20 +1,130 @@
 from json import dumps
+from time import monotonic, sleep
 from flask_login import login_required, current_user
-from flask import request, redirect, flash
-from app import app
+from flask import (Blueprint, current_app, abort, request, redirect, flash, jsonify,
+                   stream_with_context)
+from werkzeug.http import is_resource_modified
 from forms.note_form import NoteForm
 from models import Session, Note
-from utils.notes import get_notes_for_user
+from utils.notes import get_notes_for_user, iter_notes_for_user, notes_page_etag
 from utils.sanitizer import sanitize_note_text
+from utils.search import index_note, unindex_note
+from utils.fragments import invalidate_note_fragments
+from utils.writes import insert_note, run_write
+from utils.changes import current_cursor, decode_since, get_changes
 
+bp = Blueprint("notes", __name__)
 
-@app.route('/notes', methods=['GET'])
+
+@bp.route('/notes', methods=['GET'])
 @login_required
 def get_notes():
-    return get_notes_for_user(current_user.id)
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+
+    try:
+        if (request.args.get('format') == 'ndjson' or
+                request.accept_mimetypes.best == 'application/x-ndjson'):
+            return _stream_notes(cursor)
+
+        # Taken first: a change racing this read is sent again, never lost
+        changes_cursor = current_cursor()
+        page = get_notes_for_user(current_user.id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    # Clients poll this endpoint: let them revalidate instead of refetching.
+    # No Last-Modified: a deleted note would not advance it. The ETag is weak
+    # because changes_cursor moves with every write by anyone; a client that
+    # keeps an older one only gets a few changes again from /notes/changes.
+    etag = notes_page_etag(page, limit)
+    if not is_resource_modified(request.environ, etag=etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({'notes': page.notes, 'next_cursor': page.next_cursor,
+                            'changes_cursor': changes_cursor})
+    response.set_etag(etag, weak=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _stream_notes(cursor: str):
+    notes = iter_notes_for_user(current_user.id, cursor=cursor)
+
+    def generate():
+        for note in notes:
+            yield current_app.json.dumps(note) + '\n'
+
+    return current_app.response_class(stream_with_context(generate()),
+                              mimetype='application/x-ndjson')
+
+
+@bp.route('/notes/changes', methods=['GET'])
+@login_required
+def get_note_changes():
+    # Inserts/updates ("upsert") and deletions visible to the caller after
+    # ?since=<cursor>, oldest first; continue from the returned cursor.
+    try:
+        page = get_changes(current_user.id, request.args.get('since'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    response = jsonify({'changes': page.changes, 'cursor': page.cursor,
+                        'has_more': page.has_more})
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
 
 
-@app.route('/notes', methods=['POST'])
+@bp.route('/notes/changes/stream', methods=['GET'])
+@login_required
+def stream_note_changes():
+    # Server-sent events carrying the same pages as /notes/changes. Each
+    # open stream holds a worker, so it is opt-in (NOTES_SSE_ENABLED) and
+    # ends after NOTES_SSE_MAX_SECONDS; EventSource reconnects on its own
+    # and resumes from Last-Event-ID.
+    if not current_app.config['NOTES_SSE_ENABLED']:
+        abort(404)
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        decode_since(since)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+
+    user_id = current_user.id
+    poll_interval = current_app.config['NOTES_SSE_POLL_INTERVAL']
+    keepalive = current_app.config['NOTES_SSE_KEEPALIVE']
+    deadline = monotonic() + current_app.config['NOTES_SSE_MAX_SECONDS']
+
+    def generate():
+        cursor = since
+        last_sent = monotonic()
+        yield f'retry: {int(poll_interval * 1000)}\n\n'
+        while monotonic() < deadline:
+            page = get_changes(user_id, cursor)
+            if page.changes:
+                data = current_app.json.dumps({'changes': page.changes, 'cursor': page.cursor})
+                yield f'id: {page.cursor}\nevent: changes\ndata: {data}\n\n'
+                cursor = page.cursor
+                last_sent = monotonic()
+                if page.has_more:
+                    continue
+            elif monotonic() - last_sent >= keepalive:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                last_sent = monotonic()
+            sleep(poll_interval)
+
+    response = current_app.response_class(stream_with_context(generate()),
+                                  mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # nginx would otherwise buffer the events
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@bp.route('/notes', methods=['POST'])
 @login_required
 def add_note():
     form = NoteForm(request.form)
@@ -22,44 +132,61 @@ def add_note():
     if not form.validate():
         flash(dumps(form.errors), 'error')
     else:
-        with Session(expire_on_commit=False) as session:
-            raw_title = form.title.data
-            clean_title = sanitize_note_text(raw_title)
-            raw_text = form.text.data
-            clean_text = sanitize_note_text(raw_text)
-            note = Note(id=None,
-                        created_at=None,
-                        title=clean_title,
-                        text=clean_text,
-                        private=form.private.data,
-                        user_id=current_user.id)
-            session.add(note)
-            session.commit()
+        raw_title = form.title.data
+        clean_title = sanitize_note_text(raw_title)
+        raw_text = form.text.data
+        clean_text = sanitize_note_text(raw_text)
+        insert_note(Note(id=None,
+                         created_at=None,
+                         title=clean_title,
+                         text=clean_text,
+                         private=form.private.data,
+                         user_id=current_user.id))
 
         flash('Note created', 'success')
 
     return redirect('/home')
 
 
-@app.route('/notes/<int:note_id>/delete', methods=['POST'])
+def _delete_note(session: Session, note_id: int, user_id: int, is_admin: bool) -> bool:
+    note = session.get(Note, note_id)
+    if note is None or not (is_admin or note.user_id == user_id):
+        return False
+    unindex_note(session, note.id)
+    session.delete(note)
+    return True
+
+
+@bp.route('/notes/<int:note_id>/delete', methods=['POST'])
 @login_required
 def delete_note(note_id: int):
 
-    with Session() as session:
-        note = session.get(Note, note_id)
+    if not run_write(_delete_note, note_id, current_user.id, current_user.is_admin):
         # One generic message: either note doesn't exist
         # or you're not allowed to reduce ID enumeration
-        if note is None or not (current_user.is_admin or note.user_id == current_user.id):
-            flash("You either don't have a note with that ID "
-            "or you're not authorised to delete it", "warning")
-        else:
-            session.delete(note)
-            session.commit()
-            flash('Note deleted', 'info')
+        flash("You either don't have a note with that ID "
+        "or you're not authorised to delete it", "warning")
+    else:
+        invalidate_note_fragments(note_id)
+        flash('Note deleted', 'info')
 
     return redirect('/home')
 
-@app.route('/notes/<int:note_id>/edit', methods=['POST'])
+
+def _update_note(session: Session, note_id: int, user_id: int, title: str, text: str,
+                 private: bool) -> bool:
+    note = session.get(Note, note_id)
+    if note is None or note.user_id != user_id:
+        return False
+    unindex_note(session, note.id)
+    note.title = title
+    note.text = text
+    note.private = private
+    index_note(session, note)
+    return True
+
+
+@bp.route('/notes/<int:note_id>/edit', methods=['POST'])
 @login_required
 def edit_note(note_id):
     form = NoteForm(request.form)
@@ -68,18 +195,14 @@ def edit_note(note_id):
         flash(dumps(form.errors), 'error')
         return redirect('/home')
 
-    with Session(expire_on_commit=False) as session:
-        note = session.get(Note, note_id)
-        
-        if note is None or note.user_id != current_user.id:
-            flash("You don't have a note with that ID", "warning")
-        else:
-            raw_title = form.title.data
-            raw_text = form.text.data
-            note.title = sanitize_note_text(raw_title)
-            note.text = sanitize_note_text(raw_text)
-            note.private = form.private.data
-            session.commit()
-            flash('Note updated', 'success')
+    # Sanitized before the write transaction: the lock is not held for it
+    raw_title = form.title.data
+    raw_text = form.text.data
+    if not run_write(_update_note, note_id, current_user.id, sanitize_note_text(raw_title),
+                     sanitize_note_text(raw_text), form.private.data):
+        flash("You don't have a note with that ID", "warning")
+    else:
+        invalidate_note_fragments(note_id)
+        flash('Note updated', 'success')
 
     return redirect('/home')
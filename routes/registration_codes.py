@@ -1,29 +1,39 @@
 #!/usr/bin/env python3
 
+import json
 from uuid import uuid4
 
 from flask_login import login_required, current_user
-from flask import (render_template, redirect, flash)
+from flask import (Blueprint, current_app, render_template, redirect, flash, request,
+                   stream_with_context)
 
-from app import app
+from forms.registration_codes_form import BulkRegistrationCodesForm
 from models import RegistrationCode, Session
+from utils.registration_codes import (create_registration_codes,
+                                      get_registration_codes_page,
+                                      iter_registration_codes_csv, to_csv)
 
+bp = Blueprint("registration_codes", __name__)
 
-@app.route('/registration-codes', methods=['GET'])
+
+@bp.route('/registration-codes', methods=['GET'])
 @login_required
 def registration_codes():
     if not current_user.is_admin:
         flash("Not authorized to access this page", 'error')
         return redirect('/home')
 
-    with Session() as session:
-        codes = session.query(RegistrationCode).all()
+    try:
+        page = get_registration_codes_page(request.args.get('cursor', type=int))
+    except ValueError as e:
+        return {'error': str(e)}, 400
 
-        return render_template('registration_codes.html',
-                               registration_codes=codes)
+    return render_template('registration_codes.html',
+                           registration_codes=page.codes,
+                           next_cursor=page.next_cursor)
 
 
-@app.route('/registration-codes', methods=['POST'])
+@bp.route('/registration-codes', methods=['POST'])
 @login_required
 def add_registration_codes():
     if not current_user.is_admin:
@@ -37,3 +47,52 @@ def add_registration_codes():
 
     flash(f"Code added: {code.code}", 'success')
     return redirect('/registration-codes')
+
+
+@bp.route('/registration-codes/bulk', methods=['POST'])
+@login_required
+def add_registration_codes_bulk():
+    wants_json = request.accept_mimetypes.best == 'application/json'
+
+    if not current_user.is_admin:
+        if wants_json:
+            return {'error': 'Not authorized'}, 403
+        flash("Not authorized to create new registration codes", 'error')
+        return redirect('/home')
+
+    form = BulkRegistrationCodesForm(request.form)
+    if not form.validate():
+        if wants_json:
+            return {'errors': form.errors}, 400
+        flash(json.dumps(form.errors), 'error')
+        return redirect('/registration-codes')
+
+    codes = create_registration_codes(form.count.data)
+
+    if wants_json:
+        return {'codes': codes}, 201
+
+    # Browsers get the new cohort as a CSV download
+    return current_app.response_class(
+        to_csv([("code",)] + [(code,) for code in codes]),
+        status=201,
+        mimetype='text/csv',
+        headers={'Content-Disposition':
+                 'attachment; filename="registration-codes-new.csv"'})
+
+
+@bp.route('/registration-codes/export.csv', methods=['GET'])
+@login_required
+def export_registration_codes():
+    if not current_user.is_admin:
+        flash("Not authorized to access this page", 'error')
+        return redirect('/home')
+
+    response = current_app.response_class(
+        stream_with_context(iter_registration_codes_csv()),
+        mimetype='text/csv',
+        headers={'Content-Disposition':
+                 'attachment; filename="registration-codes.csv"'})
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
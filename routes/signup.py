@@ -1,10 +1,13 @@
 from sqlite3 import OperationalError
-from typing import Union
-from flask import render_template, request, redirect, flash
-from bcrypt import gensalt, hashpw
-from app import app
+from typing import Optional, Tuple, Union
+from flask import Blueprint, render_template, request, redirect, flash
 from models import Session, User, RegistrationCode
 from forms.registration_form import RegistrationForm
+from utils.passwords import hash_password
+from utils.rate_limit import throttle, too_many_attempts
+from utils.writes import run_write
+
+bp = Blueprint("signup", __name__)
 
 def validate_token(code: str, session: Session) -> Union[str, None]:
     try:
@@ -22,15 +25,57 @@ def validate_token(code: str, session: Session) -> Union[str, None]:
     except OperationalError:
         return None
 
-@app.route('/signup', methods=['GET'])
+def check_signup(session: Session, email: str, code: str
+                 ) -> Tuple[Optional[RegistrationCode], Optional[Tuple[str, str]]]:
+    # (registration code to consume, None) or (None, (flash message, category))
+
+    # Check if user already exists
+    user_already_exists = session.query(
+        session.query(User)
+        .filter(User.email == email)
+        .exists()
+    ).scalar()
+
+    if user_already_exists:
+        return None, ("A user with that email already exists.", "warning")
+
+    # Validate registration code
+    token_id = validate_token(code, session)
+    if token_id is None:
+        return None, ("Invalid registration code.", "warning")
+
+    token = session.get(RegistrationCode, token_id)
+    if token.code != code:
+        return None, ("Unexpected registration code mismatch.", "error")
+
+    return token, None
+
+
+def _create_user(session: Session, email: str, password_hash: str,
+                 code: str) -> Optional[Tuple[str, str]]:
+    # Checked again under the write lock: another signup may have taken the
+    # email or the code since the first check
+    token, problem = check_signup(session, email, code)
+    if problem is None:
+        # Consume the registration code
+        session.delete(token)
+        session.add(User(email, password_hash))
+    return problem
+
+
+@bp.route('/signup', methods=['GET'])
 def signup():
     form = RegistrationForm()
     return render_template("signup.html", form=form)
 
-@app.route("/signup", methods=["POST"])
+@bp.route("/signup", methods=["POST"])
 def do_signup():
     form = RegistrationForm(request.form)
 
+    retry_after = throttle("signup_ip", request.remote_addr or "")
+    if retry_after:
+        return too_many_attempts("signup.html", retry_after)
+
     if not form.validate():
         # Show per-field error messages
         for field_name, errors in form.errors.items():
@@ -39,41 +84,22 @@ def do_signup():
                 flash(f"{field_label}: {error}", "error")
         return redirect("/signup")
 
-    with Session() as session:
-        # Check if user already exists
-        user_already_exists = session.query(
-            session.query(User)
-            .filter(User.email == form.email.data)
-            .exists()
-        ).scalar()
-
-        if user_already_exists:
-            flash("A user with that email already exists.", "warning")
-            return redirect("/signup")
-
-        # Validate registration code
-        code = form.registration_code.data
-        token_id = validate_token(code, session)
-        if token_id is None:
-            flash("Invalid registration code.", "warning")
-            return redirect("/signup")
-
-        token = session.get(RegistrationCode, token_id)
-        if token.code != code:
-            flash("Unexpected registration code mismatch.", "error")
-            return redirect("/signup")
-
-        # Consume the registration code
-        session.delete(token)
+    retry_after = throttle("signup_account", form.email.data)
+    if retry_after:
+        return too_many_attempts("signup.html", retry_after)
 
+    email = form.email.data
+    code = form.registration_code.data
+    with Session() as session:
+        problem = check_signup(session, email, code)[1]
 
-        user = User(
-            form.email.data,
-            hashpw(form.password.data.encode("utf-8"), gensalt()).decode("utf-8"),
-        )
+    if problem is None:
+        # Hashed before the write transaction: the lock is not held for bcrypt
+        problem = run_write(_create_user, email, hash_password(form.password.data), code)
 
-        session.add(user)
-        session.commit()
-        flash("Account created successfully. You can now log in.", "success")
+    if problem is not None:
+        flash(*problem)
+        return redirect("/signup")
 
+    flash("Account created successfully. You can now log in.", "success")
     return redirect("/home")
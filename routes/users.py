@@ -0,0 +1,49 @@
+from flask import Blueprint, current_app, Response, request
+from flask_login import login_required
+
+from models import Session, User
+from utils.profile_image import decode_image_blob
+
+bp = Blueprint("users", __name__)
+
+
+def _cacheable(response: Response) -> Response:
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['AVATAR_MAX_AGE']
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def _fallback_avatar() -> Response:
+    # Served in place, not redirected, so it is cached like any other avatar
+    return _cacheable(current_app.send_static_file('fallback.png'))
+
+
+@bp.route('/users/<int:user_id>/avatar')
+@login_required
+def user_avatar(user_id: int):
+    with Session() as session:
+        digest = session.query(User.profile_image_digest).filter(
+            User.id == user_id).scalar()
+        if digest is None:
+            return _fallback_avatar()
+
+        # The stored digest is the ETag: revalidating never reads the blob
+        if request.if_none_match.contains(digest):
+            response = Response(status=304)
+            response.set_etag(digest)
+            return _cacheable(response)
+
+        blob = session.query(User.profile_image).filter(
+            User.id == user_id).scalar()
+
+    try:
+        data, mimetype = decode_image_blob(blob or b"")
+    except ValueError:
+        return _fallback_avatar()
+
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(digest)
+
+    return _cacheable(response).make_conditional(request)
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import func, select
+from config import Config
+from models import Session, Note, User
+
+
+@dataclass
+class AdminUserRow:
+    id: int
+    email: str
+    is_admin: bool
+    note_count: int
+    last_activity: Optional[datetime]
+
+
+@dataclass
+class AdminUsersPage:
+    users: List[AdminUserRow]
+    next_cursor: Optional[str]
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    # "bob" -> "boc": email >= "bob" AND email < "boc" is a range on the unique
+    # index, where LIKE 'bob%' (case-insensitive in SQLite) would scan it.
+    # A last character of U+10FFFF cannot be incremented: drop it and bump
+    # the one before; a prefix made only of those has no upper bound.
+    prefix = prefix.rstrip("\U0010ffff")
+    if not prefix:
+        return None
+    code = ord(prefix[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000  # surrogates cannot be stored as UTF-8
+    return prefix[:-1] + chr(code)
+
+
+def _users_page_statement(prefix: Optional[str], after: Optional[str], limit: int):
+    # One page of users in email order (keyset on the unique index), joined to
+    # their notes and aggregated in the same statement. Only the page's notes
+    # are read, through ix_notes_user_id_created_at.
+    users = select(User.id, User.email, User.is_admin)
+    if prefix:
+        users = users.where(User.email >= prefix)
+        upper_bound = _prefix_upper_bound(prefix)
+        if upper_bound is not None:
+            users = users.where(User.email < upper_bound)
+    if after:
+        users = users.where(User.email > after)
+    users = users.order_by(User.email).limit(limit).subquery()
+
+    return select(
+        users.c.id,
+        users.c.email,
+        users.c.is_admin,
+        # pylint cannot see through SQLAlchemy's generated func namespace
+        func.count(Note.id),  # pylint: disable=not-callable
+        func.max(func.coalesce(Note.updated_at, Note.created_at)),
+    ).select_from(users).outerjoin(Note, Note.user_id == users.c.id).group_by(
+        users.c.id, users.c.email, users.c.is_admin).order_by(users.c.email)
+
+
+def get_admin_users_page(prefix: Optional[str] = None,
+                         after: Optional[str] = None) -> AdminUsersPage:
+    limit = Config.ADMIN_USERS_PAGE_SIZE
+
+    with Session() as session:
+        rows = session.execute(_users_page_statement(prefix, after, limit + 1)).all()
+
+    users = [AdminUserRow(user_id, email, bool(is_admin), note_count, last_activity)
+             for user_id, email, is_admin, note_count, last_activity in rows]
+    next_cursor = users[limit - 1].email if len(users) > limit else None
+    return AdminUsersPage(users=users[:limit], next_cursor=next_cursor)
@@ -0,0 +1,181 @@
+import gzip
+import json
+import os
+import posixpath
+import re
+import shutil
+from hashlib import sha256
+from typing import Dict, Optional, Tuple
+from flask import Flask, has_request_context, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz siblings are written
+    brotli = None
+
+# Static asset pipeline. `flask assets build` copies the app's static/ folder
+# and the Bootstrap-Flask / Flask-CKEditor files to ASSETS_DIR under
+# content-hashed names, writes .gz (and .br) siblings, and a manifest that
+# AssetFlask.url_for uses to emit those names. nginx serves ASSETS_URL_PATH
+# from ASSETS_DIR with an immutable Cache-Control (see conf/nginx.conf).
+#
+# "file" sources hash each file (css/app.css -> css/app.<hash>.css). CKEditor
+# loads its plugins, skins and languages relative to ckeditor.js, so its
+# files keep their names and the whole tree goes under one hashed directory.
+# Renamed .css/.js files get their sourceMappingURL comment pointed at the
+# renamed .map, or dropped when the map is not part of the build.
+
+MANIFEST_NAME = "manifest.json"
+# static endpoint -> (output directory, mode)
+SOURCES = {
+    "static": ("app", "file"),
+    "bootstrap.static": ("bootstrap", "file"),
+    "ckeditor.static": ("ckeditor", "tree"),
+}
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".map", ".txt", ".html", ".xml", ".ico")
+SKIPPED = (".scss", ".less", ".md", ".py", ".pyc")
+_MIN_COMPRESS_SIZE = 1024
+# "/*# sourceMappingURL=x.css.map */" and "//# sourceMappingURL=x.js.map"
+_SOURCE_MAP = re.compile(rb"(/\*|//)# sourceMappingURL=([^\s*]+)([ \t]*\*/)?")
+_SOURCE_MAPPED = (".css", ".js")
+
+
+def _source_folder(app: Flask, endpoint: str) -> Optional[str]:
+    if endpoint == "static":
+        return app.static_folder
+    blueprint = app.blueprints.get(endpoint.rsplit(".", 1)[0])
+    return blueprint.static_folder if blueprint else None
+
+
+def _files(folder: str):
+    for root, _dirs, names in os.walk(folder):
+        for name in sorted(names):
+            if not name.endswith(SKIPPED):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, folder).replace(os.sep, "/"), path
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return sha256(f.read()).hexdigest()
+
+
+def _fingerprint(filename: str, digest: str) -> str:
+    stem, dot, ext = filename.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{filename}.{digest[:10]}"
+    return f"{stem}.{digest[:10]}.{ext}"
+
+
+def _rewrite_source_maps(data: bytes, filename: str, hashed_names: Dict[str, str]) -> bytes:
+    directory = posixpath.dirname(filename)
+
+    def replace(match):
+        url = match[2].decode()
+        if ":" in url:  # data: URI or absolute URL, unaffected by renaming
+            return match[0]
+        hashed = hashed_names.get(posixpath.normpath(posixpath.join(directory, url)))
+        if hashed is None:
+            return b""
+        return (match[1] + b"# sourceMappingURL=" +
+                posixpath.relpath(hashed, directory or ".").encode() + (match[3] or b""))
+
+    return _SOURCE_MAP.sub(replace, data)
+
+
+def _tree_prefix(prefix: str, files) -> str:
+    tree = sha256()
+    for filename, path in files:
+        tree.update(f"{filename}\0{_digest(path)}\0".encode())
+    return f"{prefix}.{tree.hexdigest()[:10]}"
+
+
+def _output_file(filename: str, path: str, mode: str,
+                 hashed_names: Dict[str, str]) -> Tuple[str, bytes]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if mode == "tree":
+        return filename, data
+
+    if filename.endswith(_SOURCE_MAPPED):
+        data = _rewrite_source_maps(data, filename, hashed_names)
+    hashed_names[filename] = _fingerprint(filename, sha256(data).hexdigest())
+    return hashed_names[filename], data
+
+
+def _write(data: bytes, target: str, stats: dict) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(data)
+    stats["files"] += 1
+    if not target.endswith(COMPRESSIBLE) or len(data) < _MIN_COMPRESS_SIZE:
+        return
+
+    # mtime=0 keeps the .gz byte-identical between builds
+    with open(f"{target}.gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    stats["gz"] += 1
+    if brotli is not None:
+        with open(f"{target}.br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        stats["br"] += 1
+
+
+def build_assets(app: Flask, output_dir: str) -> dict:
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    manifest: Dict[str, str] = {}
+    stats = {"files": 0, "gz": 0, "br": 0}
+    for endpoint, (prefix, mode) in SOURCES.items():
+        folder = _source_folder(app, endpoint)
+        if not folder or not os.path.isdir(folder):
+            continue
+
+        files = list(_files(folder))
+        if mode == "tree":
+            prefix = _tree_prefix(prefix, files)
+
+        # .map files first, so the files that reference them know their new names
+        hashed_names: Dict[str, str] = {}
+        for filename, path in sorted(files, key=lambda item: item[0].endswith(_SOURCE_MAPPED)):
+            hashed, data = _output_file(filename, path, mode, hashed_names)
+            _write(data, os.path.join(output_dir, prefix, hashed), stats)
+            manifest[f"{endpoint}:{filename}"] = f"{prefix}/{hashed}"
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    return stats
+
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class AssetFlask(Flask):
+    # url_for('static' / 'bootstrap.static' / 'ckeditor.static', filename=...)
+    # returns the fingerprinted URL when the file is in the asset manifest,
+    # and the regular (uncached, served by Python) URL otherwise.
+
+    asset_manifest: Dict[str, str] = {}
+
+    def load_assets(self) -> None:
+        self.asset_manifest = load_manifest(self.config["ASSETS_DIR"])
+
+    def url_for(self, /, endpoint: str, *, _anchor: Optional[str] = None,
+                _method: Optional[str] = None, _scheme: Optional[str] = None,
+                _external: Optional[bool] = None, **values) -> str:
+        path = self.asset_manifest.get(f"{endpoint}:{values.get('filename')}")
+        if path is None:
+            return super().url_for(endpoint, _anchor=_anchor, _method=_method,
+                                   _scheme=_scheme, _external=_external, **values)
+
+        url = f"{self.config['ASSETS_URL_PATH']}/{path}"
+        if _external and has_request_context():
+            url = request.host_url.rstrip("/") + url
+        return f"{url}#{_anchor}" if _anchor else url
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    # Bounded, thread-safe LRU cache with an optional per-entry time to live.
+    # ttl=None keeps entries until they are evicted by size.
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and (entry[1] is None or entry[1] > monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if not self.enabled or self.maxsize <= 0:
+            return
+
+        expires_at = monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
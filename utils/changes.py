@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import List, Optional
+from sqlalchemy import or_, select
+from config import Config
+from models import Note, NoteTombstone, Session
+from models.note_tombstone import next_version
+from utils.notes import SQLITE_MAX_INT
+
+# Incremental note sync. Every note insert/update takes the next version and
+# every delete leaves a tombstone with one (models/note_tombstone.py), so
+# "what changed since version N" is a range scan on two small indexes. The
+# cursor handed to clients is simply the last version they have seen.
+
+
+@dataclass
+class ChangesPage:
+    changes: List[dict]
+    cursor: str
+    has_more: bool
+
+
+def decode_since(since: Optional[str]) -> int:
+    if not since:
+        return 0
+    try:
+        version = int(since)
+    except ValueError as e:
+        raise ValueError("Invalid cursor.") from e
+    if not 0 <= version <= SQLITE_MAX_INT:
+        raise ValueError("Invalid cursor.")
+    return version
+
+
+def current_cursor() -> str:
+    # Handed out with a full GET /notes so the client can continue with deltas
+    with Session() as session:
+        return str(next_version(session) - 1)
+
+
+def _visible_to(model, user_id: int):
+    # Same rule as the feed: shared notes and the caller's own. "+ 0" hides
+    # both columns from the planner, which would otherwise OR the
+    # private/user_id indexes and sort every visible note by version instead
+    # of walking ix_notes_version from the cursor (see `flask db check-plans`).
+    return or_(model.private + 0 == 0, model.user_id + 0 == user_id)
+
+
+def _changes_statement(model, user_id: int, version: int, limit: int):
+    return (select(model).where(model.version > version, _visible_to(model, user_id))
+            .order_by(model.version).limit(limit))
+
+
+def get_changes(user_id: int, since: Optional[str] = None,
+                limit: Optional[int] = None) -> ChangesPage:
+    version = decode_since(since)
+    limit = limit or Config.NOTES_CHANGES_LIMIT
+
+    with Session(expire_on_commit=False) as session:
+        notes = session.scalars(_changes_statement(Note, user_id, version, limit + 1)).all()
+        tombstones = session.scalars(
+            _changes_statement(NoteTombstone, user_id, version, limit + 1)).all()
+
+    changes = sorted(
+        [{"type": "upsert", "version": note.version, "note": note} for note in notes]
+        + [{"type": "delete", "version": tombstone.version, "id": tombstone.note_id}
+           for tombstone in tombstones],
+        key=lambda change: change["version"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = str(changes[-1]["version"]) if changes else str(version)
+    return ChangesPage(changes=changes, cursor=cursor, has_more=has_more)
@@ -0,0 +1,150 @@
+import zlib
+from typing import Callable, Iterable, Optional, Tuple
+from flask import Flask, current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip (and zstd) are offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+# Response compression for dynamic pages (COMPRESSION_ENABLED). Static files
+# are precompressed at build time and served by nginx (see utils/assets.py);
+# this covers what the app renders: HTML feeds, JSON, NDJSON and CSV.
+#
+# The encoding is picked from Accept-Encoding (q-values respected, ties go to
+# the order in COMPRESSION_ENCODINGS). Buffered bodies below
+# COMPRESSION_MIN_SIZE are left alone: the framing costs more than it saves.
+# Streamed bodies (NDJSON, CSV export) are compressed chunk by chunk and
+# flushed after every chunk, so clients still see rows as they are produced.
+
+# Mimetype -> rule. "stream" says whether a streamed body of this type is
+# compressed; "fast" replaces the configured level for types that compress
+# well enough that a cheaper level is the better trade.
+MIMETYPE_RULES = {
+    "text/html": {"stream": True},
+    "text/plain": {"stream": True},
+    "text/csv": {"stream": True, "level": "fast"},
+    "application/json": {"stream": True},
+    "application/x-ndjson": {"stream": True, "level": "fast"},
+    "application/javascript": {"stream": False},
+    "text/css": {"stream": False},
+    "image/svg+xml": {"stream": False},
+}
+_SKIPPED_STATUS = (204, 206, 304)
+
+
+class _Encoder:
+    # One incremental compressor: feed() returns what is ready after a flush,
+    # finish() the trailer.
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes],
+                 finish: Callable[[], bytes]):
+        self.compress = compress
+        self.flush = flush
+        self.finish = finish
+
+    def feed(self, chunk: bytes) -> bytes:
+        return self.compress(chunk) + self.flush()
+
+
+def _gzip(fast: bool) -> _Encoder:
+    level = 1 if fast else current_app.config["COMPRESSION_GZIP_LEVEL"]
+    # wbits=31: zlib stream with a gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return _Encoder(compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+                    compressor.flush)
+
+
+def _brotli(fast: bool) -> _Encoder:
+    quality = 1 if fast else current_app.config["COMPRESSION_BROTLI_QUALITY"]
+    compressor = brotli.Compressor(quality=quality)
+    return _Encoder(compressor.process, compressor.flush, compressor.finish)
+
+
+def _zstd(fast: bool) -> _Encoder:
+    level = 1 if fast else current_app.config["COMPRESSION_ZSTD_LEVEL"]
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return _Encoder(compressor.compress,
+                    lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                    compressor.flush)
+
+
+ENCODERS = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return tuple(name for name in current_app.config["COMPRESSION_ENCODINGS"]
+                 if name in ENCODERS)
+
+
+def negotiate() -> Optional[str]:
+    # Accept.best_match honours q-values (q=0 refuses) and "*"
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def _stream(encoder: _Encoder, body: Iterable) -> Iterable[bytes]:
+    try:
+        for chunk in body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = encoder.feed(chunk)
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        # Replacing response.response hides the original iterable from
+        # Response.close(), which is what ends stream_with_context's context
+        close = getattr(body, "close", None)
+        if close is not None:
+            close()
+
+
+def _after_request(response):
+    rule = MIMETYPE_RULES.get(response.mimetype)
+    if rule is None or response.status_code in _SKIPPED_STATUS or response.status_code < 200:
+        return response
+    # send_file responses, bodies another layer already encoded, no-transform
+    if (response.direct_passthrough or "Content-Encoding" in response.headers
+            or "no-transform" in response.headers.get("Cache-Control", "")):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if response.is_streamed and not rule["stream"]:
+        return response
+    if not response.is_streamed and (
+            response.content_length or 0) < current_app.config["COMPRESSION_MIN_SIZE"]:
+        return response
+
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    encoder = ENCODERS[encoding](rule.get("level") == "fast")
+    if response.is_streamed:
+        response.response = _stream(encoder, response.response)
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(encoder.compress(response.get_data()) + encoder.finish())
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed body is a different representation: a strong ETag of
+    # the identity body would be wrong for it
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    # after_request hooks run in reverse registration order: registered last,
+    # this runs first and metrics then records the bytes actually sent.
+    app.after_request(_after_request)
@@ -0,0 +1,29 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+
+class ForkSafeExecutor:
+    # Lazily created ThreadPoolExecutor that is rebuilt in every process.
+    # uWSGI imports the app in the master and forks the workers afterwards;
+    # threads do not survive a fork, so a pool inherited from the master
+    # would accept work and never run it.
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None
+        self._pid = None
+        self._lock = Lock()
+
+    def _get(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.thread_name_prefix)
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self._get().submit(func, *args, **kwargs)
@@ -0,0 +1,39 @@
+from flask import render_template
+from markupsafe import Markup
+from config import Config
+from models import Note
+from utils.cache import TTLCache
+
+# Rendered, viewer-independent note fragments (the card body on /home, the
+# table row on /accounts/notes). Anything that depends on the viewer, such as
+# the owner/admin buttons and their CSRF tokens, stays outside the fragment.
+fragment_cache = TTLCache(maxsize=Config.FRAGMENT_CACHE_SIZE,
+                          enabled=Config.FRAGMENT_CACHE_SIZE > 0)
+
+NOTE_CARD_BODY = "partials/note_card_body.html"
+NOTE_ROW = "partials/note_row.html"
+NOTE_FRAGMENTS = (NOTE_CARD_BODY, NOTE_ROW)
+
+
+def note_version(note: Note) -> int:
+    # Entries are per process, so another worker's edit is only seen through
+    # the content itself: any change to what the fragment shows changes this.
+    return hash((note.title, note.text, note.private, note.created_at))
+
+
+def render_note_fragment(template_name: str, note: Note) -> Markup:
+    key = (template_name, note.id)
+    version = note_version(note)
+
+    cached = fragment_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    html = Markup(render_template(template_name, note=note))
+    fragment_cache.set(key, (version, html))
+    return html
+
+
+def invalidate_note_fragments(note_id: int) -> None:
+    for template_name in NOTE_FRAGMENTS:
+        fragment_cache.invalidate((template_name, note_id))
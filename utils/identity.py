@@ -0,0 +1,45 @@
+from typing import Optional, Union
+from config import Config
+from models import Session, User
+from utils.cache import TTLCache
+
+# Everything an authenticated request reads from current_user. The profile
+# image BLOB is deliberately not part of it (see /users/<id>/avatar).
+IDENTITY_COLUMNS = (User.id, User.email, User.password, User.is_admin)
+
+# Per-process cache: a write in one uWSGI worker only invalidates that worker,
+# the others pick up the change once IDENTITY_CACHE_TTL expires.
+identity_cache = TTLCache(maxsize=Config.IDENTITY_CACHE_SIZE,
+                          ttl=Config.IDENTITY_CACHE_TTL,
+                          enabled=Config.IDENTITY_CACHE_ENABLED)
+
+
+def _user_from_identity(identity: tuple) -> User:
+    user_id, email, password, is_admin = identity
+    # A fresh, session-less User per request, so per-request changes to
+    # current_user never leak into the cached identity.
+    user = User(email, password, is_admin)
+    user.id = user_id
+    return user
+
+
+def load_identity(user_id: Union[str, int]) -> Optional[User]:
+    try:
+        key = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    identity = identity_cache.get(key)
+    if identity is None:
+        with Session() as session:
+            row = session.query(*IDENTITY_COLUMNS).filter(User.id == key).first()
+        if row is None:
+            return None
+        identity = tuple(row)
+        identity_cache.set(key, identity)
+
+    return _user_from_identity(identity)
+
+
+def invalidate_identity(user_id: Union[str, int]) -> None:
+    identity_cache.invalidate(int(user_id))
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from typing import Optional
+from config import Config
+from models import Session, User, ImageImportJob
+from models.image_import_job import JOB_DONE, JOB_FAILED
+from utils.executor import ForkSafeExecutor
+from utils.identity import invalidate_identity
+from utils.metrics import IMAGE_FETCH_TIME, timed
+from utils.profile_image import get_base64_image_blob, image_digest
+from utils.writes import run_write
+
+# Profile image downloads run here instead of in the request. Job state lives
+# in the database, so any uWSGI worker can answer a status request.
+_executor = ForkSafeExecutor(max_workers=Config.IMAGE_IMPORT_WORKERS,
+                             thread_name_prefix="image-import")
+
+
+def _finish(session: Session, job_id: int, error: Optional[str],
+            image: Optional[bytes]) -> None:
+    job = session.get(ImageImportJob, job_id)
+    if image is not None:
+        user = session.get(User, job.user_id)
+        if user is None:
+            # Deleted while the download ran
+            error, image = "User no longer exists.", None
+        else:
+            user.profile_image = image
+            user.profile_image_digest = image_digest(image)
+    job.status = JOB_FAILED if error is not None else JOB_DONE
+    job.error = error
+    job.finished_at = datetime.now(timezone.utc)
+
+
+def run_image_import(job_id: int) -> None:
+    # No session is held during the download; only the result is written
+    with Session() as session:
+        job = session.get(ImageImportJob, job_id)
+        if job is None:
+            return
+        user_id, url = job.user_id, job.url
+
+    error = None
+    with timed(IMAGE_FETCH_TIME, outcome=JOB_DONE) as labels:
+        try:
+            image_blob = get_base64_image_blob(url)
+        except ValueError as e:
+            # Our own safety checks (unsafe URL, not an image, too large, etc.)
+            error = str(e)
+        except Exception:  # pylint: disable=broad-exception-caught
+            error = "Could not download profile image from that URL."
+        if error is not None:
+            labels["outcome"] = JOB_FAILED
+
+    if error is not None:
+        run_write(_finish, job_id, error, None)
+        return
+
+    run_write(_finish, job_id, None, image_blob.encode())
+    invalidate_identity(user_id)
+
+
+def _create_job(session: Session, user_id: int, url: str) -> ImageImportJob:
+    job = ImageImportJob(user_id, url)
+    session.add(job)
+    return job
+
+
+def submit_image_import(user_id: int, url: str) -> ImageImportJob:
+    job = run_write(_create_job, user_id, url)
+    _executor.submit(run_image_import, job.id)
+    return job
+
+
+def get_image_import(job_id: int, user_id: int) -> Optional[ImageImportJob]:
+    with Session() as session:
+        job = session.get(ImageImportJob, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        session.expunge(job)
+        return job
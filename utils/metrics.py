@@ -0,0 +1,114 @@
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from flask import Flask, g, has_request_context, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+from sqlalchemy.engine import Engine
+from utils.query_timing import listen_queries
+
+# Prometheus metrics. Under uWSGI every worker is its own process: set
+# PROMETHEUS_MULTIPROC_DIR (an empty directory, wiped on each deploy) before
+# the app is imported and prometheus_client writes the values to mmapped files
+# there, which /metrics merges across workers. Without it each process only
+# reports its own numbers.
+
+# Buckets in seconds; requests, queries and hashes live in very different ranges
+_REQUEST_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+_SQL_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+_SLOW_BUCKETS = (.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+REQUESTS = Counter("sevfa_http_requests_total", "HTTP requests.",
+                   ["method", "endpoint", "status"])
+REQUEST_TIME = Histogram("sevfa_http_request_duration_seconds",
+                         "Time spent handling a request.", ["method", "endpoint"],
+                         buckets=_REQUEST_BUCKETS)
+RESPONSE_SIZE = Histogram("sevfa_http_response_size_bytes",
+                          "Response body size (responses with a known length).", ["endpoint"],
+                          buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+SQL_QUERIES = Counter("sevfa_sql_queries_total", "SQL statements executed.")
+SQL_TIME = Histogram("sevfa_sql_query_duration_seconds", "Time per SQL statement.",
+                     buckets=_SQL_BUCKETS)
+REQUEST_SQL_QUERIES = Histogram("sevfa_http_request_sql_queries",
+                                "SQL statements per request.", ["endpoint"],
+                                buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+REQUEST_SQL_TIME = Histogram("sevfa_http_request_sql_seconds",
+                             "Total database time per request.", ["endpoint"],
+                             buckets=_SQL_BUCKETS + (2.5, 5))
+PASSWORD_HASH_TIME = Histogram("sevfa_password_hash_seconds",
+                               "bcrypt time per hash or verify.",
+                               ["operation"], buckets=_SLOW_BUCKETS)
+IMAGE_FETCH_TIME = Histogram("sevfa_image_fetch_seconds",
+                             "Profile image download time.", ["outcome"],
+                             buckets=_SLOW_BUCKETS)
+WRITE_LOCK_WAIT = Histogram("sevfa_db_write_lock_wait_seconds",
+                            "Time waiting for SQLite's write lock (BEGIN IMMEDIATE).",
+                            buckets=_SQL_BUCKETS + (2.5, 5))
+WRITE_TRANSACTION_TIME = Histogram("sevfa_db_write_transaction_seconds",
+                                   "Time the write lock is held per transaction.",
+                                   buckets=_SQL_BUCKETS)
+WRITES = Counter("sevfa_db_write_transactions_total",
+                 "Write transactions by outcome (committed, retried, failed).", ["outcome"])
+RATE_LIMIT_CHECKS = Counter("sevfa_rate_limit_checks_total",
+                            "Rate limit checks on /login and /signup.", ["rule", "outcome"])
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    # Like Histogram.time(), but labels may be changed inside the block
+    start = perf_counter()
+    try:
+        yield labels
+    finally:
+        (histogram.labels(**labels) if labels else histogram).observe(perf_counter() - start)
+
+
+def _endpoint() -> str:
+    # The endpoint name, not the URL, keeps label cardinality bounded
+    return request.endpoint or "<unmatched>"
+
+
+def _before_request():
+    g.metrics_start = perf_counter()
+    g.sql_queries = 0
+    g.sql_time = 0.0
+
+
+def _after_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+
+    endpoint = _endpoint()
+    REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+    REQUEST_TIME.labels(request.method, endpoint).observe(perf_counter() - start)
+    REQUEST_SQL_QUERIES.labels(endpoint).observe(g.get("sql_queries", 0))
+    REQUEST_SQL_TIME.labels(endpoint).observe(g.get("sql_time", 0.0))
+    # Streamed bodies have no length up front; they are not counted
+    if response.content_length is not None:
+        RESPONSE_SIZE.labels(endpoint).observe(response.content_length)
+    return response
+
+
+def _record_query(_statement: str, elapsed: float) -> None:
+    SQL_QUERIES.inc()
+    SQL_TIME.observe(elapsed)
+    # Background jobs (image imports) run outside a request
+    if has_request_context() and "sql_queries" in g:
+        g.sql_queries += 1
+        g.sql_time += elapsed
+
+
+def init_metrics(app: Flask, *engines: Engine) -> None:
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    listen_queries(engines, "metrics_query_start", _record_query)
+
+
+def render_metrics() -> tuple:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,11 +1,113 @@
-from typing import List
-from sqlalchemy import or_
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+from datetime import datetime
+from hashlib import sha256
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import and_, func, or_, select, union_all
 from sqlalchemy.orm import joinedload
+from config import Config
 from models import Session, Note
 
+SQLITE_MIN_INT = -2 ** 63
+SQLITE_MAX_INT = 2 ** 63 - 1
+
+
+@dataclass
+class NotesPage:
+    notes: List[Note]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(note: Note) -> str:
+    # Opaque "created_at|id" token pointing at the last note of a page
+    raw = f"{note.created_at.isoformat()}|{note.id}"
+    return urlsafe_b64encode(raw.encode()).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, note_id = urlsafe_b64decode(
+            cursor.encode("ascii")).decode().split("|")
+        note_id = int(note_id)
+        # Anything wider than a SQLite integer overflows in the driver
+        if not SQLITE_MIN_INT <= note_id <= SQLITE_MAX_INT:
+            raise ValueError(note_id)
+        return datetime.fromisoformat(created_at), note_id
+    except ValueError as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return Config.NOTES_PAGE_SIZE
+    return min(limit, Config.NOTES_MAX_PAGE_SIZE)
+
+
+def _visible_notes(query, user_id: int, cursor: Optional[str],
+                   limit: Optional[int] = None):
+    # "user_id = me OR private = 0" cannot be served in order by one index,
+    # SQLite would collect and sort every visible note. Instead each half walks
+    # its own index newest first and stops after `limit` rows:
+    #   shared notes      -> ix_notes_private_created_at
+    #   my private notes  -> ix_notes_user_id_created_at
+    keyset = []
+    if cursor:
+        created_at, note_id = decode_cursor(cursor)
+        keyset.append(or_(Note.created_at < created_at,
+                          and_(Note.created_at == created_at, Note.id < note_id)))
+
+    def branch(*criteria):
+        statement = select(Note.id).where(*criteria, *keyset).order_by(
+            Note.created_at.desc(), Note.id.desc())
+        return select(statement.limit(limit).subquery() if limit else statement.subquery())
+
+    visible = union_all(
+        branch(Note.private == False),  # pylint: disable=singleton-comparison
+        # Everything of mine the first branch did not return, NULL included;
+        # the coalesce keeps the planner on the user_id index
+        branch(Note.user_id == user_id, func.coalesce(Note.private, True) == True),  # pylint: disable=singleton-comparison
+    ).subquery()
+
+    query = query.join(visible, Note.id == visible.c.id).order_by(
+        Note.created_at.desc(), Note.id.desc())
+    return query.limit(limit) if limit else query
+
+
+def get_notes_for_user(user_id: int,
+                       cursor: Optional[str] = None,
+                       limit: Optional[int] = None) -> NotesPage:
+    # Keyset pagination on (created_at, id), newest first: every page is a
+    # bounded range scan, no matter how many notes are visible in total.
+    limit = clamp_page_size(limit)
 
-def get_notes_for_user(user_id: int) -> List[Note]:
     with Session(expire_on_commit=False) as session:
-        return session.query(Note).filter(
-            or_(Note.user_id == user_id,
-                Note.private == False)).options(joinedload(Note.user)).all()  # pylint: disable=singleton-comparison
+        notes = _visible_notes(session.query(Note), user_id, cursor,
+                               limit + 1).options(joinedload(Note.user)).all()
+
+    next_cursor = encode_cursor(notes[limit - 1]) if len(notes) > limit else None
+    return NotesPage(notes=notes[:limit], next_cursor=next_cursor)
+
+
+def notes_page_etag(page: NotesPage, limit: Optional[int] = None) -> str:
+    # Computed from the page that is serialized, not a second query. Every
+    # insert/update gives a note a new version, and a deleted or newly private
+    # note drops out of the page, so any change to the body changes the tag.
+    digest = sha256(f"{clamp_page_size(limit)}|{page.next_cursor}".encode())
+    for note in page.notes:
+        digest.update(f"|{note.id}@{note.version}".encode())
+    return digest.hexdigest()
+
+
+def iter_notes_for_user(user_id: int, cursor: Optional[str] = None) -> Iterator[Note]:
+    # Every visible note after the cursor, streamed from the database cursor
+    # in batches instead of being materialized as one list.
+    if cursor:
+        decode_cursor(cursor)  # reject a bad cursor before streaming starts
+
+    def rows():
+        with Session() as session:
+            statement = _visible_notes(select(Note), user_id, cursor)
+            yield from session.scalars(
+                statement.execution_options(yield_per=Config.NOTES_STREAM_BATCH))
+
+    return rows()
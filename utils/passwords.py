@@ -0,0 +1,36 @@
+from bcrypt import checkpw, gensalt, hashpw
+from config import Config
+from utils.metrics import PASSWORD_HASH_TIME
+
+# bcrypt runs inline on the request thread. It releases the GIL while
+# hashing, so other threads keep running; handing it to a pool would only
+# add a thread hop, the worker still waits for the result.
+
+
+def _timed(operation: str, func, *args):
+    with PASSWORD_HASH_TIME.labels(operation).time():
+        return func(*args)
+
+
+def _hash(password: bytes, rounds: int) -> str:
+    return hashpw(password, gensalt(rounds=rounds)).decode("utf-8")
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    return _timed("hash", _hash, password.encode("utf-8"), rounds or Config.BCRYPT_ROUNDS)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return _timed("verify", checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_cost(hashed: str) -> int:
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed: str) -> bool:
+    return hash_cost(hashed) != Config.BCRYPT_ROUNDS
@@ -1,22 +1,21 @@
-from urllib.request import urlopen, Request
+from urllib.request import Request
 from urllib.parse import urlparse
 from mimetypes import guess_type
-from base64 import b64encode
-import socket
-import ipaddress
+from base64 import b64encode, b64decode
+from hashlib import sha256
+from typing import Union
+from utils.resolver import pinned_opener, resolve_public
 
 MAX_IMAGE_SIZE = 2 * 1024 * 1024  # 2 MB
 REQUEST_TIMEOUT = 5  # seconds
 
 
 def _is_private_address(hostname: str) -> bool:
-    #prevent SSRF to internal services like 127.0.0.1 or 10.x.x.x.
     try:
-        ip = ipaddress.ip_address(socket.gethostbyname(hostname))
-    except Exception:
-        # If we can't resolve it reliably, treat as unsafe
+        resolve_public(hostname)
+    except ValueError:
         return True
-    return ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_multicast or ip.is_reserved
+    return False
 
 
 def _is_safe_image_url(url: str) -> bool:
@@ -48,7 +47,8 @@ def download(url: str):
     # Set a simple User-Agent and enforce timeout
     req = Request(url, headers={"User-Agent": "EVFA-ProfileImageFetcher/1.0"})
 
-    with urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+    # The opener connects to the address vetted above (served from the DNS cache)
+    with pinned_opener.open(req, timeout=REQUEST_TIMEOUT) as response:
         content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
 
         if not content_type.startswith("image/"):
@@ -69,3 +69,21 @@ def get_base64_image_blob(url: str) -> str:
     encoded = b64encode(data).decode("ascii")
 
     return f"data:{mimetype};base64,{encoded}"
+
+
+def decode_image_blob(blob: bytes) -> tuple:
+    # Reverse of get_base64_image_blob: b"data:<mime>;base64,<data>" -> (bytes, mime)
+    header, _, encoded = blob.decode("ascii").partition(",")
+    mimetype = header[len("data:"):].split(";")[0]
+
+    if not header.startswith("data:") or not mimetype.startswith("image/"):
+        raise ValueError("Stored profile image is not an image data URI.")
+
+    return b64decode(encoded), mimetype
+
+
+def image_digest(blob: Union[str, bytes]) -> str:
+    # Stored in users.profile_image_digest and used as the avatar ETag
+    if isinstance(blob, str):
+        blob = blob.encode("ascii")
+    return sha256(blob).hexdigest()
@@ -0,0 +1,176 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import List, Optional
+from uuid import uuid4
+from flask import Flask, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy.engine import Engine
+from utils.query_timing import listen_queries
+
+# On-demand request profiling (PROFILING_ENABLED). A request is profiled when
+# an admin asks for it (X-Profile: 1 header or ?_profile=1) or when it falls
+# in the PROFILING_SAMPLE_RATE fraction. Each profile holds cProfile stats,
+# collapsed stacks from a stack sampler (flamegraph.pl / speedscope input)
+# and the SQL statements the request ran, stored as one JSON file in
+# PROFILING_DIR; only the newest PROFILING_MAX_FILES are kept.
+
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[0-9a-f]{8}$")
+_STATS_LINES = 60
+
+
+class StackSampler:
+    # Samples one thread's Python stack every `interval` seconds from a
+    # helper thread; counts identical stacks as "outer;...;inner count".
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # pylint: disable=protected-access
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+                             f"{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _requested() -> bool:
+    flag = request.headers.get("X-Profile") == "1" or request.args.get("_profile") == "1"
+    # Only admins may profile on demand: profiles expose code paths and SQL
+    return flag and current_user.is_authenticated and current_user.is_admin
+
+
+def _before_request():
+    config = current_app.config
+    if not (_requested() or random.random() < config["PROFILING_SAMPLE_RATE"]):
+        return
+
+    g.profile = {
+        "profiler": cProfile.Profile(),
+        "sampler": StackSampler(threading.get_ident(), config["PROFILING_INTERVAL_MS"] / 1000),
+        "sql": [],
+        "start": perf_counter(),
+        "started_at": datetime.now(timezone.utc),
+    }
+    try:
+        g.profile["profiler"].enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger) already owns this thread
+        del g.profile
+        return
+    g.profile["sampler"].start()
+
+
+def _after_request(response):
+    profile = g.pop("profile", None)
+    if profile is None:
+        return response
+
+    profile["profiler"].disable()
+    collapsed = profile["sampler"].stop()
+    duration = perf_counter() - profile["start"]
+
+    stats_text = io.StringIO()
+    pstats.Stats(profile["profiler"], stream=stats_text).sort_stats(
+        "cumulative").print_stats(_STATS_LINES)
+
+    started_at = profile["started_at"]
+    profile_id = f"{started_at:%Y%m%dT%H%M%S%f}-{uuid4().hex[:8]}"
+    _write(profile_id, {
+        "id": profile_id,
+        "started_at": started_at.isoformat(),
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "user_id": current_user.get_id() if current_user.is_authenticated else None,
+        "pid": os.getpid(),
+        "duration_ms": round(duration * 1000, 2),
+        "sql": profile["sql"],
+        "stats": stats_text.getvalue(),
+        "collapsed": collapsed,
+    })
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _record_query(statement: str, elapsed: float) -> None:
+    if _profiling():
+        # Statements only: parameters may hold password hashes or note bodies
+        g.profile["sql"].append({"statement": statement,
+                                 "duration_ms": round(elapsed * 1000, 3)})
+
+
+def _profiling() -> bool:
+    # Background jobs run SQL outside any request
+    return has_request_context() and "profile" in g
+
+
+def _write(profile_id: str, data: dict) -> None:
+    directory = current_app.config["PROFILING_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{profile_id}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, os.path.join(directory, f"{profile_id}.json"))
+
+    # Ring buffer: ids sort by time, drop the oldest beyond the limit. Several
+    # workers may prune at once, so a file can already be gone.
+    for old_id in list_profile_ids()[current_app.config["PROFILING_MAX_FILES"]:]:
+        try:
+            os.remove(os.path.join(directory, f"{old_id}.json"))
+        except FileNotFoundError:
+            pass
+
+
+def list_profile_ids() -> List[str]:
+    # Newest first
+    try:
+        names = os.listdir(current_app.config["PROFILING_DIR"])
+    except FileNotFoundError:
+        return []
+    ids = [name[:-len(".json")] for name in names if name.endswith(".json")]
+    return sorted((i for i in ids if PROFILE_ID.match(i)), reverse=True)
+
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(current_app.config["PROFILING_DIR"], f"{profile_id}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def init_profiling(app: Flask, *engines: Engine) -> None:
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    listen_queries(engines, "profile_query_start", _record_query)
@@ -0,0 +1,69 @@
+import re
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from models import Note, NoteTombstone, User
+from utils.admin_users import _users_page_statement
+from utils.changes import _changes_statement
+from utils.notes import _visible_notes, encode_cursor
+from utils.search import _SEARCH_SQL
+
+# A plan line like "SCAN notes" means SQLite reads the whole table (or the
+# whole of an index) for that step; every hot query should SEARCH instead.
+_FULL_SCAN = re.compile(r"^SCAN (notes|users)( |$)")
+
+_SAMPLE_CURSOR = encode_cursor(SimpleNamespace(id=1000, created_at=datetime.now(timezone.utc)))
+
+# name -> (statement builder, indexes the plan must use)
+HOT_QUERIES: Dict[str, Tuple[Callable[[], Tuple], Tuple[str, ...]]] = {
+    "home feed": (
+        lambda: (_visible_notes(select(Note), 1, None, 21), None),
+        ("ix_notes_private_created_at", "ix_notes_user_id_created_at")),
+    "home feed (cursor)": (
+        lambda: (_visible_notes(select(Note), 1, _SAMPLE_CURSOR, 21), None),
+        ("ix_notes_private_created_at", "ix_notes_user_id_created_at")),
+    "personal notes": (
+        lambda: (select(Note).where(Note.user_id == 1), None),
+        ("ix_notes_user_id_created_at",)),
+    "delete/edit note": (
+        lambda: (select(Note).where(Note.id == 1), None),
+        ("INTEGER PRIMARY KEY",)),
+    "search": (
+        lambda: (_SEARCH_SQL, {"start": "", "end": "", "query": '"note"*',
+                               "user_id": 1, "limit": 21, "offset": 0}),
+        ("notes_fts VIRTUAL TABLE", "INTEGER PRIMARY KEY")),
+    "login by email": (
+        lambda: (select(User.id).where(User.email == "user@evfa.com"), None),
+        ("sqlite_autoindex_users_1",)),
+    "admin users page": (
+        lambda: (_users_page_statement("user", "user@", 51), None),
+        ("sqlite_autoindex_users_1", "ix_notes_user_id_created_at")),
+    "note changes": (
+        lambda: (_changes_statement(Note, 1, 1000, 501), None),
+        ("ix_notes_version",)),
+    "note tombstones": (
+        lambda: (_changes_statement(NoteTombstone, 1, 1000, 501), None),
+        ("ix_note_tombstones_version",)),
+}
+
+
+def explain(engine: Engine, statement, params=None) -> List[str]:
+    compiled = statement.compile(dialect=engine.dialect)
+    values = dict(compiled.params, **(params or {}))
+    positional = tuple(values[name] for name in compiled.positiontup)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", positional)
+        return [row[3] for row in rows]
+
+
+def check_query_plans(engine: Engine) -> Dict[str, Tuple[bool, List[str]]]:
+    results = {}
+    for name, (build, indexes) in HOT_QUERIES.items():
+        # pylint cannot infer the lambdas through the dict literal
+        plan = explain(engine, *build())  # pylint: disable=not-callable
+        uses_indexes = all(any(index in step for step in plan) for index in indexes)
+        no_full_scan = not any(_FULL_SCAN.match(step) for step in plan)
+        results[name] = (uses_indexes and no_full_scan, plan)
+    return results
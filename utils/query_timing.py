@@ -0,0 +1,33 @@
+from time import perf_counter
+from typing import Callable, Iterable
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Times each SQL statement run on an engine and passes (statement, seconds)
+# to a callback; used by utils.metrics and utils.profiling. Start times are
+# a stack in connection.info under the caller's key. A statement that raises
+# never reaches after_cursor_execute, so handle_error drops its start time
+# instead of leaving it on the pooled connection.
+
+
+def listen_queries(engines: Iterable[Engine], key: str,
+                   on_query: Callable[[str, float], None]) -> None:
+
+    def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault(key, []).append(perf_counter())
+
+    def after_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany):
+        starts = conn.info.get(key)
+        if starts:
+            on_query(statement, perf_counter() - starts.pop())
+
+    def handle_error(context) -> None:
+        if context.statement is not None and context.connection is not None:
+            starts = context.connection.info.get(key)
+            if starts:
+                starts.pop()
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
@@ -0,0 +1,135 @@
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+from flask import Response, flash, make_response, render_template
+from config import Config
+from utils.metrics import RATE_LIMIT_CHECKS
+
+# Sliding-window rate limits for the endpoints that run bcrypt (/login,
+# /signup), checked before any hashing. The hits live in a small SQLite file
+# of their own (RATE_LIMIT_DB) so all uWSGI workers on the host share them
+# without an external service, and limiter writes never wait on the app
+# database's write lock.
+#
+# Sliding log: a key may have at most `limit` hits in the last `window`
+# seconds. Rejected attempts are not recorded, so a key never holds more than
+# `limit` rows and a flood costs one small transaction per request.
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS rate_limit_hits (key TEXT NOT NULL, at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_rate_limit_hits_key_at ON rate_limit_hits (key, at)",
+)
+# Fraction of hits that also purge rows of keys that went quiet
+_PURGE_PROBABILITY = 0.01
+
+
+def parse_rule(rule: str) -> Tuple[int, float]:
+    # "20/60" -> at most 20 hits per 60 seconds
+    limit, window = rule.split("/")
+    return int(limit), float(window)
+
+
+RULES: Dict[str, Tuple[int, float]] = {
+    "login_ip": parse_rule(Config.RATE_LIMIT_LOGIN_IP),
+    "login_account": parse_rule(Config.RATE_LIMIT_LOGIN_ACCOUNT),
+    "signup_ip": parse_rule(Config.RATE_LIMIT_SIGNUP_IP),
+    "signup_account": parse_rule(Config.RATE_LIMIT_SIGNUP_ACCOUNT),
+}
+
+
+class SlidingWindowLimiter:
+    # One connection per thread and process: sqlite3 connections may not be
+    # shared across threads, and must not survive a fork.
+
+    def __init__(self, path: str, busy_timeout_ms: int):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # isolation_level=None: transactions are begun explicitly below
+            connection = sqlite3.connect(self.path, isolation_level=None,
+                                         timeout=self.busy_timeout_ms / 1000)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def hit(self, key: str, limit: int, window: float) -> float:
+        # Records a hit for key and returns 0, or returns the seconds until
+        # the oldest hit leaves the window when the key is over its limit.
+        connection = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front: the count and the insert
+        # are one atomic step even with several workers hitting the same key
+        connection.execute("BEGIN IMMEDIATE")  # may raise "database is locked"
+        try:
+            connection.execute("DELETE FROM rate_limit_hits WHERE key = ? AND at <= ?",
+                               (key, now - window))
+            count, oldest = connection.execute(
+                "SELECT count(*), min(at) FROM rate_limit_hits WHERE key = ?", (key,)).fetchone()
+            if count >= limit:
+                # limit 0 blocks the key outright (no oldest hit to wait for)
+                retry_after = window if oldest is None else max(oldest + window - now, 0.001)
+            else:
+                connection.execute("INSERT INTO rate_limit_hits (key, at) VALUES (?, ?)",
+                                   (key, now))
+                retry_after = 0.0
+            if random.random() < _PURGE_PROBABILITY:
+                connection.execute("DELETE FROM rate_limit_hits WHERE at <= ?",
+                                   (now - max(rule[1] for rule in RULES.values()),))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def reset(self, key: str) -> None:
+        self._connection().execute("DELETE FROM rate_limit_hits WHERE key = ?", (key,))
+
+
+limiter = SlidingWindowLimiter(Config.RATE_LIMIT_DB, Config.SQLITE_BUSY_TIMEOUT_MS)
+
+
+def _key(rule: str, value: str) -> str:
+    return f"{rule}:{value.strip().lower()}"
+
+
+def throttle(rule: str, value: str) -> float:
+    # 0 when the attempt may go ahead, otherwise the Retry-After in seconds
+    if not Config.RATE_LIMIT_ENABLED:
+        return 0.0
+
+    limit, window = RULES[rule]
+    try:
+        retry_after = limiter.hit(_key(rule, value), limit, window)
+    except sqlite3.Error:
+        # Fail open: a broken limiter must not lock everybody out
+        RATE_LIMIT_CHECKS.labels(rule, "error").inc()
+        return 0.0
+    RATE_LIMIT_CHECKS.labels(rule, "rejected" if retry_after else "allowed").inc()
+    return retry_after
+
+
+def clear(rule: str, value: str) -> None:
+    if Config.RATE_LIMIT_ENABLED:
+        try:
+            limiter.reset(_key(rule, value))
+        except sqlite3.Error:
+            pass
+
+
+def too_many_attempts(template: str, retry_after: float) -> Response:
+    flash("Too many attempts. Please try again later.", "warning")
+    response = make_response(render_template(template), 429)
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response
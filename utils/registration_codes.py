@@ -0,0 +1,79 @@
+import csv
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from io import StringIO
+from typing import Iterable, Iterator, List, Optional
+from uuid import uuid4
+from sqlalchemy import insert, select
+from config import Config
+from models import Session, RegistrationCode
+from utils.notes import SQLITE_MAX_INT, SQLITE_MIN_INT
+
+CSV_HEADER = ("id", "code", "created_at")
+
+# Rows per INSERT statement: 2 bound parameters per row stays well below
+# SQLite's 999 variable limit on older builds.
+_INSERT_CHUNK = 400
+
+
+@dataclass
+class RegistrationCodesPage:
+    codes: List[RegistrationCode]
+    next_cursor: Optional[int]
+
+
+def create_registration_codes(count: int) -> List[str]:
+    # One multi-row INSERT per chunk inside a single transaction, instead of
+    # one ORM object and one INSERT per code.
+    now = datetime.now(timezone.utc)
+    codes = [str(uuid4()) for _ in range(count)]
+    table = RegistrationCode.__table__
+
+    with Session() as session:
+        for start in range(0, count, _INSERT_CHUNK):
+            session.execute(insert(table).values([
+                {"code": code, "created_at": now}
+                for code in codes[start:start + _INSERT_CHUNK]
+            ]))
+        session.commit()
+
+    return codes
+
+
+def get_registration_codes_page(cursor: Optional[int] = None) -> RegistrationCodesPage:
+    # Newest first, keyset on the primary key: the cursor is the last id shown
+    limit = Config.REGISTRATION_CODES_PAGE_SIZE
+    statement = select(RegistrationCode).order_by(RegistrationCode.id.desc())
+    if cursor is not None:
+        # Anything wider than a SQLite integer overflows in the driver
+        if not SQLITE_MIN_INT <= cursor <= SQLITE_MAX_INT:
+            raise ValueError("Invalid cursor.")
+        statement = statement.where(RegistrationCode.id < cursor)
+
+    with Session(expire_on_commit=False) as session:
+        codes = session.scalars(statement.limit(limit + 1)).all()
+
+    next_cursor = codes[limit - 1].id if len(codes) > limit else None
+    return RegistrationCodesPage(codes=codes[:limit], next_cursor=next_cursor)
+
+
+def to_csv(rows: Iterable[tuple]) -> str:
+    buffer = StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def iter_registration_codes_csv() -> Iterator[str]:
+    # CSV text in chunks of REGISTRATION_CODES_EXPORT_BATCH rows, read from the
+    # database cursor with yield_per so memory does not grow with the table.
+    batch = Config.REGISTRATION_CODES_EXPORT_BATCH
+    yield to_csv([CSV_HEADER])
+
+    with Session() as session:
+        result = session.execute(
+            select(RegistrationCode.id, RegistrationCode.code,
+                   RegistrationCode.created_at).order_by(
+                       RegistrationCode.id).execution_options(yield_per=batch))
+        for rows in result.partitions():
+            yield to_csv((code_id, code, created_at.isoformat() if created_at else "")
+                         for code_id, code, created_at in rows)
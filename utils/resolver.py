@@ -0,0 +1,112 @@
+import ipaddress
+import socket
+from http.client import HTTPConnection, HTTPSConnection
+from typing import Tuple
+from urllib.parse import urlparse
+from urllib.request import (HTTPDefaultErrorHandler, HTTPErrorProcessor, HTTPHandler,
+                            HTTPRedirectHandler, HTTPSHandler, OpenerDirector)
+from config import Config
+from utils.cache import TTLCache
+
+# Resolved addresses per hostname. A host is only cached once every address
+# it resolves to has been vetted, so a cache hit is always safe to connect to.
+dns_cache = TTLCache(maxsize=Config.DNS_CACHE_SIZE,
+                     ttl=Config.DNS_CACHE_TTL,
+                     enabled=Config.DNS_CACHE_ENABLED)
+
+
+def _is_public(ip) -> bool:
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return not (ip.is_private or ip.is_loopback or ip.is_link_local
+                or ip.is_multicast or ip.is_reserved or ip.is_unspecified)
+
+
+def resolve_public(hostname: str) -> Tuple[str, ...]:
+    # prevent SSRF to internal services like 127.0.0.1 or 10.x.x.x: every A/AAAA
+    # record must be public, otherwise a mixed answer could still reach inside.
+    addresses = dns_cache.get(hostname)
+    if addresses is not None:
+        return addresses
+
+    try:
+        infos = socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
+        ips = {ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos}
+    except (OSError, ValueError) as e:
+        # If we can't resolve it reliably, treat as unsafe
+        raise ValueError("Unsafe image URL.") from e
+
+    if not ips or not all(_is_public(ip) for ip in ips):
+        raise ValueError("Unsafe image URL.")
+
+    # IPv4 first: most image hosts are reachable over it
+    addresses = tuple(str(ip) for ip in sorted(ips, key=lambda ip: (ip.version, ip)))
+    dns_cache.set(hostname, addresses)
+    return addresses
+
+
+def _create_pinned_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,  # pylint: disable=protected-access
+                              source_address=None):
+    host, port = address
+    last_error = None
+    for ip in resolve_public(host):
+        try:
+            return socket.create_connection((ip, port), timeout, source_address)
+        except OSError as e:
+            last_error = e
+    raise last_error
+
+
+class _PinnedConnectionMixin:
+    # http.client opens sockets through self._create_connection. Swapping it
+    # makes the connection go to the vetted IP while the Host header, SNI and
+    # certificate checks keep using the hostname. Redirect targets go through
+    # the same check.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_pinned_connection
+
+
+class PinnedHTTPConnection(_PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class PinnedHTTPSConnection(_PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _PinnedHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(PinnedHTTPConnection, req)
+
+
+class _PinnedHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(PinnedHTTPSConnection, req,
+                            context=self._context)
+
+
+class _HTTPOnlyRedirectHandler(HTTPRedirectHandler):
+    # urllib follows redirects to ftp:// as well; those would bypass the
+    # pinned handlers above. The signature is urllib's.
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urlparse(newurl).scheme not in ("http", "https"):
+            raise ValueError("Unsafe image URL.")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _build_pinned_opener() -> OpenerDirector:
+    # Not build_opener(): it adds the proxy, ftp, file and data handlers. Only
+    # the pinned http(s) handlers can open anything here, so the connection
+    # always goes straight to the address we vetted.
+    opener = OpenerDirector()
+    for handler in (_PinnedHTTPHandler(), _PinnedHTTPSHandler(), _HTTPOnlyRedirectHandler(),
+                    HTTPDefaultErrorHandler(), HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener
+
+
+pinned_opener = _build_pinned_opener()
@@ -1,4 +1,9 @@
+from hashlib import sha256
+from threading import local
+from typing import Iterable, List
 import bleach
+from config import Config
+from utils.cache import TTLCache
 
 # Allow only basic formatting tags
 ALLOWED_TAGS = [
@@ -10,9 +15,49 @@ ALLOWED_TAGS = [
 ]
 
 
+class NoteSanitizer:
+    # Builds its bleach.Cleaner once instead of on every call, and remembers
+    # the output for recently seen inputs (an edit usually resubmits an
+    # unchanged title or body). Cleaner instances keep parser state and are
+    # not thread-safe, so there is one per thread.
+
+    def __init__(self, tags: List[str], cache_size: int):
+        self.tags = tags
+        self.cache = TTLCache(maxsize=cache_size, enabled=cache_size > 0)
+        self._local = local()
+
+    def _cleaner(self) -> bleach.Cleaner:
+        cleaner = getattr(self._local, "cleaner", None)
+        if cleaner is None:
+            cleaner = self._local.cleaner = bleach.Cleaner(tags=self.tags, strip=True)
+        return cleaner
+
+    def clean(self, raw: str) -> str:
+        raw = raw or ""
+        key = sha256(raw.encode("utf-8")).digest()
+        cleaned = self.cache.get(key)
+        if cleaned is None:
+            cleaned = self._cleaner().clean(raw)
+            self.cache.set(key, cleaned)
+        return cleaned
+
+    def clean_many(self, raws: Iterable[str]) -> List[str]:
+        # Bulk imports: identical documents in a batch are only cleaned once
+        cleaned = {}
+        results = []
+        for raw in raws:
+            if raw not in cleaned:
+                cleaned[raw] = self.clean(raw)
+            results.append(cleaned[raw])
+        return results
+
+
+note_sanitizer = NoteSanitizer(ALLOWED_TAGS, Config.SANITIZER_CACHE_SIZE)
+
+
 def sanitize_note_text(raw: str) -> str:
-    return bleach.clean(
-        raw or "",
-        tags=ALLOWED_TAGS,
-        strip=True,
-    )
+    return note_sanitizer.clean(raw)
+
+
+def sanitize_note_texts(raws: Iterable[str]) -> List[str]:
+    return note_sanitizer.clean_many(raws)
@@ -0,0 +1,153 @@
+import re
+from dataclasses import dataclass
+from html import unescape
+from typing import List, Optional
+from markupsafe import Markup, escape
+from sqlalchemy import or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from config import Config
+from models import Session, Note, engine
+from models.note_search import (NOTES_FTS_TABLE, ensure_search_index,
+                                search_index_supported)
+from utils.notes import SQLITE_MAX_INT
+
+# Private-use code points never occur in the indexed plain text, so the
+# highlight markers can be swapped for <mark> after the snippet is escaped.
+_HIGHLIGHT_START = "\ue000"
+_HIGHLIGHT_END = "\ue001"
+SNIPPET_TOKENS = 16
+# Note bodies are sanitized HTML, so a literal "<" in the text is always
+# escaped and every "<...>" is a tag
+_TAG = re.compile(r"<[^>]*>")
+_SPACES = re.compile(r"\s+")
+_INDEX_BATCH = 1000
+
+_INSERT_FTS = text(f"INSERT INTO {NOTES_FTS_TABLE}(rowid, title, text) "
+                   "VALUES (:id, :title, :text)")
+
+_SEARCH_SQL = text(
+    f"SELECT notes.id, "
+    f"snippet({NOTES_FTS_TABLE}, 1, :start, :end, '…', {SNIPPET_TOKENS}) "
+    f"FROM {NOTES_FTS_TABLE} JOIN notes ON notes.id = {NOTES_FTS_TABLE}.rowid "
+    f"WHERE {NOTES_FTS_TABLE} MATCH :query AND notes.user_id = :user_id "
+    # Title matches weigh more than body matches
+    f"ORDER BY bm25({NOTES_FTS_TABLE}, 10.0, 1.0), notes.id DESC "
+    f"LIMIT :limit OFFSET :offset")
+
+
+@dataclass
+class SearchResult:
+    note: Note
+    snippet: Markup
+
+
+@dataclass
+class SearchPage:
+    results: List[SearchResult]
+    page: int
+    has_next: bool
+
+
+def to_match_query(search: str) -> Optional[str]:
+    # Each word becomes a quoted prefix term, so user input can never be
+    # parsed as FTS5 syntax and partially typed words still match.
+    terms = [term.replace('"', '""') for term in search.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def plain_text(html: str) -> str:
+    # Tags become spaces so "<p>one</p><p>two</p>" stays two words
+    return _SPACES.sub(" ", unescape(_TAG.sub(" ", html or ""))).strip()
+
+
+def _render_snippet(plain: str) -> Markup:
+    return Markup(str(escape(plain)).replace(_HIGHLIGHT_START, "<mark>").replace(
+        _HIGHLIGHT_END, "</mark>"))
+
+
+def _fts_row(note_id: int, title: str, body: str) -> dict:
+    return {"id": note_id, "title": plain_text(title), "text": plain_text(body)}
+
+
+def index_note(session: Session, note: Note) -> None:
+    if not search_index_supported(engine):
+        return
+    session.execute(_INSERT_FTS, _fts_row(note.id, note.title, note.text))
+
+
+def unindex_note(session: Session, note_id: int) -> None:
+    if not search_index_supported(engine):
+        return
+    session.execute(text(f"DELETE FROM {NOTES_FTS_TABLE} WHERE rowid = :id"),
+                    {"id": note_id})
+
+
+def fill_search_index(connection: Connection) -> None:
+    # Replaces the whole index with the current notes, in id batches
+    connection.execute(text(f"DELETE FROM {NOTES_FTS_TABLE}"))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(Note.id, Note.title, Note.text).where(Note.id > last_id)
+            .order_by(Note.id).limit(_INDEX_BATCH)).all()
+        if not rows:
+            return
+        connection.execute(_INSERT_FTS, [_fts_row(*row) for row in rows])
+        last_id = rows[-1][0]
+
+
+def rebuild_search_index(bind: Engine) -> None:
+    if not search_index_supported(bind):
+        return
+
+    with bind.begin() as connection:
+        ensure_search_index(connection)
+        fill_search_index(connection)
+
+
+def _search_like(session: Session, user_id: int, search: str, limit: int,
+                 offset: int) -> List[SearchResult]:
+    notes = session.query(Note).filter(
+        Note.user_id == user_id,
+        or_(Note.title.like(f"%{search}%"), Note.text.like(f"%{search}%"))
+    ).order_by(Note.id.desc()).limit(limit).offset(offset).all()
+    return [SearchResult(note, _render_snippet(plain_text(note.text))) for note in notes]
+
+
+def search_notes(user_id: int, search: str, page: int = 1) -> SearchPage:
+    limit = Config.SEARCH_PAGE_SIZE
+    # Keeps OFFSET within SQLite's integer range; such a page is empty anyway
+    page = min(max(page, 1), SQLITE_MAX_INT // limit)
+    offset = (page - 1) * limit
+    query = to_match_query(search)
+
+    if query is None:
+        return SearchPage(results=[], page=page, has_next=False)
+
+    with Session(expire_on_commit=False) as session:
+        if not search_index_supported(engine):
+            results = _search_like(session, user_id, search, limit + 1, offset)
+        else:
+            rows = session.execute(_SEARCH_SQL, {
+                "start": _HIGHLIGHT_START,
+                "end": _HIGHLIGHT_END,
+                "query": query,
+                "user_id": user_id,
+                "limit": limit + 1,
+                "offset": offset,
+            }).all()
+            notes = {
+                note.id: note
+                for note in session.query(Note).filter(
+                    Note.id.in_([row[0] for row in rows]))
+            }
+            results = [
+                SearchResult(notes[note_id], _render_snippet(snippet))
+                for note_id, snippet in rows
+            ]
+
+    return SearchPage(results=results[:limit],
+                      page=page,
+                      has_next=len(results) > limit)
@@ -0,0 +1,146 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+from typing import Callable, List, Optional, Tuple, TypeVar
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session as SessionType
+from config import Config
+from models import Note, WriteSession
+from utils.metrics import WRITE_LOCK_WAIT, WRITE_TRANSACTION_TIME, WRITES
+from utils.search import index_note
+
+# Write coordinator. Every uWSGI worker writes to the same SQLite file and
+# SQLite allows one writer at a time, so writes go through run_write():
+#
+# - the transaction starts with BEGIN IMMEDIATE (models.write_engine): the
+#   write lock is taken up front, waiting at most WRITE_LOCK_TIMEOUT_MS,
+#   instead of a deferred read transaction failing when it tries to upgrade;
+# - `work` only touches the database, so the transaction stays short; flash
+#   messages and cache invalidation happen after it returns;
+# - "database is locked" rolls back and retries the whole unit after a
+#   jittered exponential backoff, at most WRITE_RETRY_ATTEMPTS times.
+#
+# Retries re-run `work` from scratch, so it must not have side effects
+# outside the session.
+
+T = TypeVar("T")
+
+
+def is_lock_error(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: workers that collided do not retry in lockstep
+    return random.uniform(0, Config.WRITE_RETRY_BACKOFF_MS / 1000 * 2 ** attempt)
+
+
+def run_write(work: Callable[..., T], *args) -> T:
+    attempt = 0
+    while True:
+        try:
+            with WriteSession() as session:
+                start = time.perf_counter()
+                session.connection()  # BEGIN IMMEDIATE: waits for the lock
+                locked = time.perf_counter()
+                WRITE_LOCK_WAIT.observe(locked - start)
+
+                result = work(session, *args)
+                session.commit()
+                WRITE_TRANSACTION_TIME.observe(time.perf_counter() - locked)
+        except OperationalError as e:
+            attempt += 1
+            if not is_lock_error(e) or attempt >= Config.WRITE_RETRY_ATTEMPTS:
+                WRITES.labels("failed").inc()
+                raise
+            WRITES.labels("retried").inc()
+            time.sleep(_backoff(attempt))
+        else:
+            WRITES.labels("committed").inc()
+            return result
+
+
+class NoteGroupCommitter:
+    # Optional group commit for note inserts (WRITE_GROUP_COMMIT). Requests
+    # queue their note and wait; one thread per process takes whatever is
+    # queued within WRITE_GROUP_COMMIT_WINDOW_MS (at most
+    # WRITE_GROUP_COMMIT_MAX notes) and inserts it in one transaction, so N
+    # concurrent inserts pay for one lock acquisition and one WAL commit.
+    # Only useful when a worker serves requests from several threads.
+
+    def __init__(self, window: float, max_batch: int):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "Queue[Tuple[Note, Future]]" = Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self) -> None:
+        # Threads do not survive a fork, see utils/executor.py
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = Queue()
+                self._thread = threading.Thread(target=self._run, name="note-group-commit",
+                                                daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _take_batch(self) -> List[Tuple[Note, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                ids = run_write(_insert_notes, [note for note, _ in batch])
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), note_id in zip(batch, ids):
+                    future.set_result(note_id)
+
+    def add(self, note: Note) -> int:
+        self._ensure_thread()
+        future: Future = Future()
+        self._queue.put((note, future))
+        return future.result()
+
+
+def _insert_notes(session: SessionType, notes: List[Note]) -> List[int]:
+    # Fresh copies: a failed attempt leaves the originals attached to the
+    # rolled back session
+    copies = [Note(id=None, created_at=None, title=note.title, text=note.text,
+                   private=note.private, user_id=note.user_id) for note in notes]
+    session.add_all(copies)
+    session.flush()
+    for note in copies:
+        index_note(session, note)
+    return [note.id for note in copies]
+
+
+_group_committer: Optional[NoteGroupCommitter] = None
+if Config.WRITE_GROUP_COMMIT:
+    _group_committer = NoteGroupCommitter(Config.WRITE_GROUP_COMMIT_WINDOW_MS / 1000,
+                                          Config.WRITE_GROUP_COMMIT_MAX)
+
+
+def insert_note(note: Note) -> int:
+    # Returns the new note id; `note` itself is only read
+    if _group_committer is not None:
+        return _group_committer.add(note)
+    return run_write(_insert_notes, [note])[0]